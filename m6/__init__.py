@@ -0,0 +1,15 @@
+'''
+description:                                Importable library for experiment M6 (internal friction / Innere Reibung).
+
+                                                from m6 import Measurements, Constants, compute
+                                                results = compute(Measurements(times, diameters, densities, density_errorranges), Constants())
+
+                                            compute() has no side effects. Reading, writing and printing are optional layers in
+                                            m6.reader, m6.writer and m6.report.
+'''
+
+from m6.core import Constants, Measurements, Results, compute
+
+__version__ = "1.2"
+
+__all__ = ["Constants", "Measurements", "Results", "compute"]
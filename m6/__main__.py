@@ -0,0 +1,5 @@
+import sys
+
+from m6.cli import main
+
+sys.exit(main())
@@ -0,0 +1,155 @@
+'''
+description:                                Batch mode for experiment M6. Evaluates many dataset directories in one run across a
+                                            process pool. Every dataset directory has to contain the four input CSV files. The
+                                            outputs of a dataset are written to its own subdirectory of the output directory and
+                                            one summary table with a row per dataset is written next to them. A failing dataset
+                                            is reported in the summary and doesn't abort the other ones.
+
+manifest                                    Text file with one dataset directory per line. Empty lines and lines starting with #
+                                            are ignored, relative paths are relative to the manifest.
+'''
+
+import csv
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from m6.core import Constants
+from m6.ladenburg import fit_wall_correction, write_wall_correction
+from m6.pipeline import evaluate
+from m6.reader import read_globules
+from m6.writer import write_monte_carlo, write_results
+
+SUMMARY_FILENAME = "summary.csv"
+
+SUMMARY_FIELDS = (
+    "dataset",
+    "path_input",
+    "status",
+    "series",
+    "globules",
+    "mean_dynamic_viscosity",
+    "mean_dynamic_viscosity_errorrange",
+    "mean_ladenburg_dynamic_viscosity",
+    "mean_ladenburg_dynamic_viscosity_errorrange",
+    "kinematic_viscosity",
+    "kinematic_viscosity_errorrange",
+    "rejected_sinkingtimes",
+    "fitted_dynamic_viscosity",
+    "fitted_dynamic_viscosity_errorrange",
+    "wall_coefficient",
+    "wall_coefficient_errorrange",
+    "error",
+)
+
+
+# Reads the dataset directories of a manifest file
+def read_manifest(location):
+    location = Path(location)
+    directories = []
+
+    with open(location) as manifest:
+        for line in manifest:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            directories.append(location.parent / line)
+
+    return directories
+
+# Expands glob patterns to the matching dataset directories
+def expand_patterns(patterns):
+    directories = []
+
+    for pattern in patterns:
+        matches = sorted(glob.glob(str(pattern)))
+        directories.extend(Path(match) for match in matches if Path(match).is_dir())
+
+    return directories
+
+# Gives every dataset an unique name for its output directory
+def dataset_names(directories):
+    names = []
+    seen = {}
+
+    for directory in directories:
+        name = Path(directory).resolve().name
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+
+    return names
+
+# Runs the pipeline for a single dataset, errors are returned in the summary row
+def run_dataset(name, path_input, path_output, constants, output_format="csv", monte_carlo_samples=0, seed=0, distribution="normal",
+                error_method="minmax", cache=None, outliers=None, wall_correction=False):
+    row = {"dataset": name, "path_input": str(path_input)}
+
+    try:
+        results, monte_carlo = evaluate(path_input, constants, error_method, monte_carlo_samples, seed, distribution, cache=cache,
+                                        outliers=outliers)
+
+        path_output = Path(path_output)
+        path_output.mkdir(parents=True, exist_ok=True)
+        write_results(results, path_output, output_format)
+
+        if monte_carlo is not None:
+            write_monte_carlo(monte_carlo, path_output)
+
+        if wall_correction:
+            fit = fit_wall_correction(read_globules(path_input), results, constants)
+            write_wall_correction(fit, path_output)
+            row.update(
+                fitted_dynamic_viscosity=fit.dynamic_viscosity,
+                fitted_dynamic_viscosity_errorrange=fit.dynamic_viscosity_errorrange,
+                wall_coefficient=fit.wall_coefficient,
+                wall_coefficient_errorrange=fit.wall_coefficient_errorrange,
+            )
+    except Exception as error:
+        row.update(status="failed", error=f"{type(error).__name__}: {error}")
+        return row
+
+    row.update(
+        status="ok",
+        series=results.sinkingtimes_errorranges.shape[0],
+        globules=results.sinkingtimes_errorranges.shape[1],
+        mean_dynamic_viscosity=results.mean_dynamic_viscosity,
+        mean_dynamic_viscosity_errorrange=results.mean_dynamic_viscosity_errorrange,
+        mean_ladenburg_dynamic_viscosity=results.mean_ladenburg_dynamic_viscosity,
+        mean_ladenburg_dynamic_viscosity_errorrange=results.mean_ladenburg_dynamic_viscosity_errorrange,
+        kinematic_viscosity=results.kinematic_viscosity,
+        kinematic_viscosity_errorrange=results.kinematic_viscosity_errorrange,
+        rejected_sinkingtimes=int(results.rejected_sinkingtimes.sum()) if results.rejected_sinkingtimes is not None else "",
+    )
+
+    return row
+
+# Writes the summary table of a batch run
+def write_summary(location, rows):
+    with open(location, "w", newline="") as summary:
+        writer = csv.DictWriter(summary, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+# Runs the pipeline for all datasets in parallel and returns the summary rows in the order of the datasets
+def run_batch(directories, path_output, constants=Constants(), workers=None, output_format="csv",
+              monte_carlo_samples=0, seed=0, distribution="normal", error_method="minmax", cache=None, outliers=None,
+              wall_correction=False):
+    path_output = Path(path_output)
+    path_output.mkdir(parents=True, exist_ok=True)
+    names = dataset_names(directories)
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = [executor.submit(run_dataset, name, directory, path_output / name, constants, output_format,
+                                   monte_carlo_samples, seed, distribution, error_method, cache, outliers, wall_correction)
+                   for name, directory in zip(names, directories)]
+        rows = [future.result() for future in futures]
+
+    write_summary(path_output / SUMMARY_FILENAME, rows)
+
+    for row in rows:
+        if row["status"] != "ok":
+            print(f"{row['dataset']} ({row['path_input']}) failed: {row['error']}", file=sys.stderr)
+
+    return rows
@@ -0,0 +1,193 @@
+'''
+description:                                Benchmark suite for experiment M6. Synthetic datasets of the given sizes are generated,
+                                            read, computed stage by stage and written, and every step is timed separately. The
+                                            measurements can be saved as baseline and later runs are compared against it.
+
+                                                python -m m6 benchmark --rows 10 1000 100000 --globules 1 10 100 --save-baseline baseline.json
+                                                python -m m6 benchmark --rows 10 1000 100000 --globules 1 10 100 --compare baseline.json
+
+Synthetic datasets:                         The globule diameters are spread from 1 mm to 8 mm, the densities scatter around
+                                            7800 kg/m^3. The sinking times follow from the Ladenburg corrected Stokes law for a
+                                            viscosity of 0.9 Pa * s with 1 % normal noise per measurement. The CSV files are written
+                                            in chunks, so datasets larger than the memory can be generated.
+
+Steps:                                      read_csv    reading the four input files
+                                            one step per stage of m6.core.STAGES
+                                            write_csv   writing the 18 output CSV files
+
+Measurements:                               seconds     best time of all repetitions
+                                            throughput  measured values (rows * globules) per second
+                                            peak_bytes  peak of the memory allocated during the step, measured by tracemalloc in an
+                                                        extra run, so it doesn't slow down the timed repetitions
+'''
+
+import dataclasses
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from m6.core import STAGES, Constants, Results
+from m6.profiling import step_name
+from m6.reader import read_measurements
+from m6.writer import write_csv_results
+
+DEFAULT_ROWS = (10, 1000, 100000)
+DEFAULT_GLOBULES = (1, 10, 100)
+DEFAULT_REPEAT = 5
+DEFAULT_MAX_VALUES = 10 ** 7        # larger datasets of the grid of rows and globules are skipped
+DEFAULT_THRESHOLD = 1.25            # a step is reported as regression, if it is slower than baseline * threshold
+NOISE_SECONDS = 0.0001             # slower steps are no regression, if they lose less time than this
+GENERATOR_CHUNK_ROWS = 65536
+
+
+@dataclass
+class Measurement:
+    rows: int
+    globules: int
+    step: str
+    seconds: float
+    throughput: float
+    peak_bytes: int
+
+
+# Writes a synthetic dataset of the given size into a directory
+def generate_dataset(path, rows, globules, seed=0, constants=Constants()):
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    diameters = np.linspace(0.001, 0.008, globules) + rng.normal(0, 1e-5, globules)
+    densities = 7800 + rng.normal(0, 5, globules)
+    density_errorranges = np.full(globules, 5.0)
+    velocities = ((2 * np.square(diameters / 2) / 9) * constants.g * (densities - constants.fluid_density)
+                  / (0.9 * (1 + 2.1 * diameters / constants.cylinder_diameter)))
+    times = constants.cylinder_length / velocities
+
+    np.savetxt(path / "globules_diameters.csv", diameters[np.newaxis], delimiter=",", fmt="%.8f")
+    np.savetxt(path / "globules_density.csv", densities[np.newaxis], delimiter=",", fmt="%.3f")
+    np.savetxt(path / "globules_density_errorranges.csv", density_errorranges[np.newaxis], delimiter=",", fmt="%.3f")
+
+    with open(path / "sinkingtimes.csv", "w") as file:
+        for start in range(0, rows, GENERATOR_CHUNK_ROWS):
+            chunk_rows = min(GENERATOR_CHUNK_ROWS, rows - start)
+            np.savetxt(file, times * (1 + rng.normal(0, 0.01, (chunk_rows, globules))), delimiter=",", fmt="%.6f")
+
+    return path
+
+# Runs every step once and returns the seconds of each step, with tracemalloc running also the peak memory of each step
+def run_steps(path_input, path_output, constants=Constants()):
+    seconds = {}
+    peaks = {}
+
+    # Runs a single step and measures it
+    def measure(name, function, *arguments):
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        value = function(*arguments)
+        seconds[name] = time.perf_counter() - start
+
+        if tracemalloc.is_tracing():
+            peaks[name] = tracemalloc.get_traced_memory()[1] - current
+
+        return value
+
+    measurements = measure("read_csv", read_measurements, path_input)
+    results = Results.allocate(*measurements.sinkingtimes.shape)
+    # A single globule has no SEM, it is NaN like in the normal run, just without the warning
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for stage in STAGES:
+            measure(step_name(stage), stage, measurements, constants, results)
+    measure("write_csv", write_csv_results, results, path_output)
+
+    return seconds, peaks
+
+# Benchmarks all steps for one dataset size
+def benchmark_dataset(path_data, rows, globules, repeat=DEFAULT_REPEAT, seed=0):
+    # The seed is part of the name, so datasets kept in a data directory are only reused for the same seed
+    path_input = Path(path_data) / f"{rows}x{globules}_seed{seed}"
+    if not (path_input / "sinkingtimes.csv").exists():
+        generate_dataset(path_input, rows, globules, seed)
+
+    with tempfile.TemporaryDirectory() as temporary:
+        path_output = Path(temporary)
+        best = None
+        for _ in range(0, repeat):
+            seconds, _ = run_steps(path_input, path_output)
+            best = seconds if best is None else {name: min(best[name], seconds[name]) for name in best}
+
+        tracemalloc.start()
+        try:
+            _, peaks = run_steps(path_input, path_output)
+        finally:
+            tracemalloc.stop()
+
+    return [Measurement(rows, globules, name, best[name], rows * globules / best[name] if best[name] > 0 else float("inf"), peaks[name])
+            for name in best]
+
+# Benchmarks all steps for every combination of rows and globules up to max_values measured values
+def run_benchmark(rows=DEFAULT_ROWS, globules=DEFAULT_GLOBULES, repeat=DEFAULT_REPEAT, max_values=DEFAULT_MAX_VALUES, path_data=None, seed=0):
+    measurements = []
+
+    with tempfile.TemporaryDirectory() as temporary:
+        path_data = Path(path_data) if path_data is not None else Path(temporary)
+        for row_count in rows:
+            for globule_count in globules:
+                if row_count * globule_count <= max_values:
+                    measurements.extend(benchmark_dataset(path_data, row_count, globule_count, repeat, seed))
+
+    return measurements
+
+# Versions and machine, which are stored with a baseline
+def environment():
+    return {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(), "processor": platform.processor()}
+
+# Saves the measurements as baseline
+def save_baseline(measurements, location):
+    document = {"environment": environment(), "measurements": [dataclasses.asdict(measurement) for measurement in measurements]}
+    Path(location).write_text(json.dumps(document, indent=1))
+
+# Loads the measurements of a baseline
+def load_baseline(location):
+    document = json.loads(Path(location).read_text())
+    return [Measurement(**measurement) for measurement in document["measurements"]]
+
+# Whether a step is slower than its baseline * threshold by more than the timer noise
+def is_regression(seconds, baseline_seconds, threshold=DEFAULT_THRESHOLD):
+    return seconds > baseline_seconds * threshold and seconds - baseline_seconds > NOISE_SECONDS
+
+# Formats the measurements as table, with a baseline also the ratio to it and a mark at every regression
+def format_table(measurements, baseline=None, threshold=DEFAULT_THRESHOLD):
+    reference = {(m.rows, m.globules, m.step): m.seconds for m in baseline or ()}
+
+    lines = [f"{'rows':>9} {'globules':>8} {'step':<36} {'seconds':>12} {'values/s':>12} {'peak MiB':>9}" + (f" {'ratio':>7}" if baseline else "")]
+    for m in measurements:
+        line = f"{m.rows:>9} {m.globules:>8} {m.step:<36} {m.seconds:>12.6f} {m.throughput:>12.4g} {m.peak_bytes / 2 ** 20:>9.2f}"
+
+        previous = reference.get((m.rows, m.globules, m.step))
+        if previous:
+            ratio = m.seconds / previous
+            line += f" {ratio:>7.2f}" + ("  slower" if is_regression(m.seconds, previous, threshold) else "")
+        lines.append(line)
+
+    return "\n".join(lines) + "\n"
+
+# Returns the measurements, which are slower than their baseline * threshold
+def regressions(measurements, baseline, threshold=DEFAULT_THRESHOLD):
+    reference = {(m.rows, m.globules, m.step): m.seconds for m in baseline}
+
+    return [m for m in measurements if (m.rows, m.globules, m.step) in reference
+            and is_regression(m.seconds, reference[(m.rows, m.globules, m.step)], threshold)]
+
+# Prints the measurements
+def print_table(measurements, baseline=None, threshold=DEFAULT_THRESHOLD, stream=None):
+    (stream or sys.stdout).write(format_table(measurements, baseline, threshold))
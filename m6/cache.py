@@ -0,0 +1,201 @@
+'''
+description:                                Content-addressed on-disk cache for the results of experiment M6. The key is a hash of
+                                            the contents of the four input files, the apparatus constants, the method of the error
+                                            ranges, the outlier rejection, the Monte Carlo settings and the code version. A hit
+                                            returns the stored results without reading the measurements or computing anything.
+
+Code version:                               m6.__version__ plus a hash of the source files of the computation, so any change of
+                                            the formulas invalidates the cache without a version bump.
+
+Eviction:                                   Entries stored more than max_age seconds ago are removed. If the cache grows beyond
+                                            max_bytes, the least recently used entries are removed until it fits again. The
+                                            modification time of an entry is the time it was stored, a hit sets only its access
+                                            time. Every store scans the cache directory once to evict.
+
+Damaged entries:                            An entry, which vanished by a concurrent eviction or can't be decoded, is a miss and
+                                            is removed, so the results are computed again.
+
+directory                                   $M6_CACHE_DIR, $XDG_CACHE_HOME/m6 or ~/.cache/m6
+'''
+
+import dataclasses
+import hashlib
+import io
+import os
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60
+
+# Modules, whose source is part of the code version
+COMPUTATION_MODULES = ("engine.py", "core.py", "linear.py", "robust.py", "montecarlo.py", "reader.py", "writer.py")
+
+_code_version = None
+
+
+# Hash of m6.__version__ and the source of the computation modules
+def code_version():
+    global _code_version
+
+    if _code_version is None:
+        from m6 import __version__
+
+        digest = hashlib.blake2b(__version__.encode(), digest_size=16)
+        for module in COMPUTATION_MODULES:
+            digest.update((Path(__file__).parent / module).read_bytes())
+        _code_version = digest.hexdigest()
+
+    return _code_version
+
+# Default cache directory
+def default_directory():
+    if os.environ.get("M6_CACHE_DIR"):
+        return Path(os.environ["M6_CACHE_DIR"])
+
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "m6"
+
+# Hash of the contents of the given files
+def hash_files(locations):
+    digest = hashlib.blake2b(digest_size=32)
+
+    for location in locations:
+        with open(location, "rb") as file:
+            while True:
+                block = file.read(1 << 20)
+                if not block:
+                    break
+                digest.update(block)
+        digest.update(b"\0")
+
+    return digest.hexdigest()
+
+# Hash of the input files of a dataset, the constants and further settings
+def dataset_key(input_files, constants, **settings):
+    digest = hashlib.blake2b(digest_size=32)
+    digest.update(code_version().encode())
+    digest.update(hash_files(input_files).encode())
+    digest.update(repr(dataclasses.astuple(constants)).encode())
+    digest.update(repr(sorted(settings.items())).encode())
+
+    return digest.hexdigest()
+
+# Encodes Monte Carlo results as NPZ archive
+def encode_monte_carlo(monte_carlo):
+    arrays = {"samples": monte_carlo.samples, "seed": monte_carlo.seed, "distribution": monte_carlo.distribution}
+    for name, distribution in monte_carlo.quantities.items():
+        arrays[name + ".mean"] = distribution.mean
+        arrays[name + ".std"] = distribution.std
+        arrays[name + ".percentiles"] = distribution.percentiles
+
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+
+    return buffer.getvalue()
+
+# Decodes Monte Carlo results of an NPZ archive
+def decode_monte_carlo(location):
+    from m6.montecarlo import QUANTITIES, Distribution, MonteCarloResults
+
+    with np.load(location) as archive:
+        quantities = {}
+        for name in QUANTITIES:
+            mean = archive[name + ".mean"]
+            std = archive[name + ".std"]
+            quantities[name] = Distribution(mean=mean[()] if mean.ndim == 0 else mean,
+                                            std=std[()] if std.ndim == 0 else std,
+                                            percentiles=archive[name + ".percentiles"])
+
+        return MonteCarloResults(samples=int(archive["samples"]), seed=int(archive["seed"]),
+                                 distribution=str(archive["distribution"]), quantities=quantities)
+
+
+class ResultCache:
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE):
+        self.directory = Path(directory) if directory is not None else default_directory()
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def location(self, key, kind):
+        return self.directory / f"{key}.{kind}.npz"
+
+    # Returns the location of a stored entry and marks it as used by its access time, or None
+    def lookup(self, key, kind):
+        location = self.location(key, kind)
+        try:
+            os.utime(location, (time.time(), location.stat().st_mtime))
+        except FileNotFoundError:
+            return None
+
+        return location
+
+    # Decodes a stored entry, an entry, which vanished meanwhile or is damaged, is removed and counts as miss
+    def load(self, key, kind, decode):
+        location = self.lookup(key, kind)
+        if location is None:
+            return None
+
+        try:
+            return decode(location)
+        except (FileNotFoundError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            location.unlink(missing_ok=True)
+            return None
+
+    # Stores an entry atomically, so concurrent processes never see half written entries
+    def store(self, key, kind, data):
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(data)
+        os.replace(temporary, self.location(key, kind))
+
+        self.evict()
+
+    def load_results(self, key):
+        from m6.reader import read_results
+
+        return self.load(key, "results", read_results)
+
+    def store_results(self, key, results):
+        from m6.writer import encode_npz
+
+        self.store(key, "results", encode_npz(results))
+
+    def load_monte_carlo(self, key):
+        return self.load(key, "montecarlo", decode_monte_carlo)
+
+    def store_monte_carlo(self, key, monte_carlo):
+        self.store(key, "montecarlo", encode_monte_carlo(monte_carlo))
+
+    # Removes entries stored more than max_age ago and the least recently used entries beyond max_bytes
+    def evict(self):
+        now = time.time()
+        entries = []
+
+        for location in self.directory.glob("*.npz"):
+            try:
+                status = location.stat()
+            except FileNotFoundError:
+                continue
+
+            if now - status.st_mtime > self.max_age:
+                location.unlink(missing_ok=True)
+            else:
+                entries.append((status.st_atime, status.st_size, location))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, location in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            location.unlink(missing_ok=True)
+            total -= size
+
+    # Removes all entries
+    def clear(self):
+        for location in self.directory.glob("*.npz"):
+            location.unlink(missing_ok=True)
@@ -0,0 +1,435 @@
+'''
+description:                                Command line interface for experiment M6.
+
+                                                python -m m6 run <input directory> <output directory>
+                                                python -m m6 batch <output directory> --glob "semester/*/" --manifest datasets.txt
+                                                python -m m6 run <input directory> <output directory> --output-format parquet
+                                                python -m m6 run <input directory> <output directory> --stream --chunk-rows 100000
+                                                python -m m6 run <input directory> <output directory> --incremental
+                                                python -m m6 convert <input directory>/sinkingtimes.csv
+                                                python -m m6 watch <input directory> <output directory> --port 8765
+                                                python -m m6 serve --port 8766
+                                                python -m m6 sweep <sweep table> <output directory> --fit arrhenius vogel_fulcher
+                                                python -m m6 benchmark --rows 10 1000 --globules 1 10 --save-baseline baseline.json
+                                                python -m m6 run <input directory> <output directory> --verbosity full --log-format json
+                                                python -m m6 run <input directory> <output directory> --error-method linear
+                                                python -m m6 run <input directory> <output directory> --outliers grubbs
+                                                python -m m6 run <input directory> <output directory> --fit-wall-correction
+                                                python -m m6 run <input directory> <output directory> --profile table --profile-capture tracemalloc
+
+                                            Every apparatus constant of m6.Constants can be given as option, for example
+                                            --fluid-density 965 --fluid-density-errorrange 0.5
+'''
+
+import argparse
+import contextlib
+import dataclasses
+import sys
+from pathlib import Path
+
+from m6.core import Constants
+
+
+# Adds an option for every apparatus constant
+def add_constants_arguments(parser):
+    group = parser.add_argument_group("apparatus constants (SI units)")
+    for field in dataclasses.fields(Constants):
+        group.add_argument("--" + field.name.replace("_", "-"), dest=field.name, type=float, default=field.default)
+
+# Creates the constants from the parsed options
+def constants_from_arguments(arguments):
+    return Constants(**{field.name: getattr(arguments, field.name) for field in dataclasses.fields(Constants)})
+
+# Adds the option for the method of the error ranges
+def add_error_method_arguments(parser):
+    from m6.core import ERROR_METHODS
+
+    parser.add_argument("--error-method", choices=ERROR_METHODS, default="minmax",
+                        help="minmax evaluates the formulas at the bounds of all inputs, linear uses first-order error propagation (default: minmax)")
+
+# Adds the options for the outlier rejection of the sinking times
+def add_outlier_arguments(parser):
+    from m6.robust import OUTLIER_METHODS
+
+    group = parser.add_argument_group("outlier rejection")
+    group.add_argument("--outliers", choices=OUTLIER_METHODS, default=None,
+                       help="reject outliers of the sinking times of every globule before averaging, or weight the means by the sinking time error ranges")
+    group.add_argument("--outlier-threshold", type=float, default=None,
+                       help="significance level for grubbs (0.05), expected count for chauvenet (0.5), modified z-score for mad (3.5)")
+
+# Creates the outlier rejection from the parsed options, None if it is switched off
+def outliers_from_arguments(arguments):
+    if arguments.outliers is None:
+        return None
+
+    from m6.robust import OutlierRejection
+
+    return OutlierRejection(arguments.outliers, arguments.outlier_threshold)
+
+# Adds the option for the output format
+def add_output_arguments(parser):
+    from m6.writer import OUTPUT_FORMATS
+
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS, default="csv",
+                        help="csv writes the legacy set of CSV files, the other formats one consolidated results file (default: csv)")
+
+# Adds the options for the verbosity and format of the console output
+def add_report_arguments(parser):
+    from m6.report import LOG_FORMATS, VERBOSITY_LEVELS
+
+    parser.add_argument("--verbosity", choices=VERBOSITY_LEVELS, default="summary",
+                        help="silent, summary of the single values or full output of every value (default: summary)")
+    parser.add_argument("--log-format", choices=LOG_FORMATS, default="text", help="text or JSON lines (default: text)")
+    parser.add_argument("--log-file", type=Path, default=None, help="write the output to this file instead of the console")
+
+# Opens the stream for the reported results
+def open_log(arguments):
+    if arguments.log_file is None:
+        return contextlib.nullcontext(sys.stdout)
+
+    return open(arguments.log_file, "w", buffering=1024 * 1024)
+
+# Adds the options for the Monte Carlo propagation
+def add_monte_carlo_arguments(parser):
+    from m6.montecarlo import DEFAULT_SAMPLES, DISTRIBUTIONS
+
+    group = parser.add_argument_group("Monte Carlo uncertainty propagation")
+    group.add_argument("--monte-carlo-samples", type=int, default=0,
+                       help=f"number of samples, e.g. {DEFAULT_SAMPLES}, 0 switches the propagation off (default: 0)")
+    group.add_argument("--seed", type=int, default=0, help="seed of the random generator (default: 0)")
+    group.add_argument("--distribution", choices=DISTRIBUTIONS, default="normal", help="distribution of the inputs (default: normal)")
+
+# Adds the options for the result cache
+def add_cache_arguments(parser):
+    from m6.cache import DEFAULT_MAX_AGE, DEFAULT_MAX_BYTES
+
+    group = parser.add_argument_group("result cache")
+    group.add_argument("--no-cache", action="store_true", help="always recompute and don't store the results")
+    group.add_argument("--cache-dir", type=Path, default=None, help="cache directory (default: $M6_CACHE_DIR or ~/.cache/m6)")
+    group.add_argument("--cache-max-bytes", type=int, default=DEFAULT_MAX_BYTES, help="evict entries beyond this size (default: 512 MiB)")
+    group.add_argument("--cache-max-age", type=float, default=DEFAULT_MAX_AGE, help="evict entries older than this in seconds (default: 30 days)")
+
+# Creates the result cache from the parsed options, None if it is switched off
+def cache_from_arguments(arguments):
+    if arguments.no_cache:
+        return None
+
+    from m6.cache import ResultCache
+
+    return ResultCache(arguments.cache_dir, arguments.cache_max_bytes, arguments.cache_max_age)
+
+# Adds the options for the profile of the steps
+def add_profile_arguments(parser):
+    from m6.profiling import CAPTURE_MODES, PROFILE_FORMATS
+
+    group = parser.add_argument_group("profiling")
+    group.add_argument("--profile", choices=PROFILE_FORMATS, default=None,
+                       help="print wall time, elements and I/O bytes of every step to stderr as table or JSON")
+    group.add_argument("--profile-capture", choices=CAPTURE_MODES, default=None,
+                       help="additionally run cProfile or record the peak memory of every step by tracemalloc")
+    group.add_argument("--cprofile-output", type=Path, default=None, help="dump the cProfile statistics to this file for pstats")
+
+# Runs the pipeline for a single dataset
+def run(arguments):
+    if arguments.stream and arguments.incremental:
+        print("--stream and --incremental can't be combined", file=sys.stderr)
+        return 1
+
+    if (arguments.stream or arguments.incremental) and arguments.outliers is not None:
+        print("--stream and --incremental keep no measurements for the outlier rejection", file=sys.stderr)
+        return 1
+
+    if (arguments.stream or arguments.incremental) and arguments.output_format != "csv":
+        print("--stream and --incremental write the legacy CSV files only", file=sys.stderr)
+        return 1
+
+    Path(arguments.path_output).mkdir(parents=True, exist_ok=True)
+
+    if arguments.profile is None and arguments.profile_capture is None:
+        return evaluate_dataset(arguments)
+
+    from m6.profiling import Profiler, print_profile, profiling
+
+    profiler = Profiler(arguments.profile_capture)
+    with profiling(profiler):
+        status = evaluate_dataset(arguments)
+
+    if arguments.cprofile_output is not None and profiler.cprofile is not None:
+        profiler.cprofile.dump_stats(arguments.cprofile_output)
+    print_profile(profiler, arguments.profile or "table")
+
+    return status
+
+# Evaluates, writes and reports a single dataset
+def evaluate_dataset(arguments):
+    from m6 import profiling
+    from m6.report import print_monte_carlo, print_results
+    from m6.writer import write_monte_carlo, write_results
+
+    constants = constants_from_arguments(arguments)
+
+    if arguments.stream or arguments.incremental:
+        from m6.montecarlo import propagate
+        from m6.reader import read_globules
+
+        if arguments.stream:
+            from m6.stream import compute_stream
+
+            results = compute_stream(arguments.path_input, arguments.path_output, constants, arguments.chunk_rows, arguments.error_method)
+        else:
+            from m6.incremental import update
+
+            results, _ = update(arguments.path_input, arguments.path_output, constants, arguments.error_method)
+
+        monte_carlo = None
+        if arguments.monte_carlo_samples > 0:
+            with profiling.step("monte_carlo", arguments.monte_carlo_samples * results.mean_sinkingtimes.shape[0]):
+                monte_carlo = propagate(read_globules(arguments.path_input), constants, results, arguments.monte_carlo_samples,
+                                        arguments.seed, arguments.distribution, workers=arguments.workers)
+    else:
+        from m6.pipeline import evaluate
+
+        results, monte_carlo = evaluate(arguments.path_input, constants, arguments.error_method, arguments.monte_carlo_samples,
+                                        arguments.seed, arguments.distribution, arguments.workers, cache_from_arguments(arguments),
+                                        outliers=outliers_from_arguments(arguments))
+        write_results(results, arguments.path_output, arguments.output_format)
+
+    if monte_carlo is not None:
+        write_monte_carlo(monte_carlo, arguments.path_output)
+
+    wall_correction = None
+    if arguments.fit_wall_correction:
+        from m6.ladenburg import fit_wall_correction, write_wall_correction
+        from m6.reader import read_globules
+
+        with profiling.step("wall_correction_fit", results.mean_sinkingtimes.shape[0]):
+            wall_correction = fit_wall_correction(read_globules(arguments.path_input), results, constants)
+        write_wall_correction(wall_correction, arguments.path_output)
+
+    with profiling.step("report"), open_log(arguments) as stream:
+        print_results(results, arguments.verbosity, arguments.log_format, stream)
+        if monte_carlo is not None:
+            print_monte_carlo(monte_carlo, arguments.verbosity, arguments.log_format, stream)
+        if wall_correction is not None and arguments.verbosity != "silent":
+            from m6.ladenburg import format_wall_correction
+
+            stream.write(format_wall_correction(wall_correction, arguments.log_format))
+
+    return 0
+
+# Runs the pipeline for many datasets
+def batch(arguments):
+    from m6.batch import expand_patterns, read_manifest, run_batch
+
+    directories = expand_patterns(arguments.glob)
+    for manifest in arguments.manifest:
+        directories.extend(read_manifest(manifest))
+
+    if not directories:
+        print("No dataset directories found", file=sys.stderr)
+        return 1
+
+    cache = cache_from_arguments(arguments)
+    rows = run_batch(directories, arguments.path_output, constants_from_arguments(arguments), arguments.workers, arguments.output_format,
+                     arguments.monte_carlo_samples, arguments.seed, arguments.distribution, arguments.error_method, cache,
+                     outliers_from_arguments(arguments), arguments.fit_wall_correction)
+    failed = sum(row["status"] != "ok" for row in rows)
+    if arguments.verbosity != "silent":
+        print(f"{len(rows) - failed} of {len(rows)} datasets processed, {failed} failed")
+
+    return 1 if failed else 0
+
+# Converts a sinking times CSV file into a memory-mappable .npy file
+def convert(arguments):
+    from m6.convert import convert_csv
+
+    destination = convert_csv(arguments.location, arguments.destination, arguments.chunk_rows)
+    print(f"{arguments.location} converted to {destination}")
+
+    return 0
+
+# Watches a dataset directory and updates the results on every change until interrupted or terminated
+def watch(arguments):
+    import signal
+    import threading
+
+    from m6.report import print_results
+    from m6.watch import watch
+
+    # Reports every update with its latency followed by the results
+    def report(results, new_rows, changed, latency):
+        if arguments.verbosity == "silent":
+            return
+
+        with contextlib.nullcontext(sys.stdout) if arguments.log_file is None else open(arguments.log_file, "a") as stream:
+            if arguments.log_format == "text":
+                stream.write(f"{', '.join(sorted(changed))} changed, {new_rows} new rows, updated in {latency * 1000:.1f} ms\n")
+            print_results(results, arguments.verbosity, arguments.log_format, stream)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+
+    try:
+        watch(arguments.path_input, arguments.path_output, constants_from_arguments(arguments), arguments.error_method, arguments.debounce,
+              arguments.polling, arguments.poll_interval, arguments.port, report, stop)
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+# Serves the computation over HTTP on 127.0.0.1 until interrupted
+def serve(arguments):
+    from m6.server import serve
+
+    print(f"Serving on http://127.0.0.1:{arguments.port}, POST /compute, GET /metrics", flush=True)
+    try:
+        serve(arguments.port, constants_from_arguments(arguments), arguments.max_batch, arguments.batch_window)
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+# Evaluates a sweep over fluids and temperatures and fits the viscosity-temperature models
+def sweep(arguments):
+    from m6.sweep import format_fits, run_sweep
+
+    Path(arguments.path_output).mkdir(parents=True, exist_ok=True)
+    entries, _, fits = run_sweep(arguments.table, arguments.path_output, constants_from_arguments(arguments), arguments.error_method,
+                                 arguments.fit, arguments.fit_quantity, arguments.output_format, outliers_from_arguments(arguments))
+
+    if arguments.verbosity != "silent":
+        print(f"{len(entries)} sweep entries evaluated")
+        sys.stdout.write(format_fits(fits))
+
+    return 0
+
+# Benchmarks every step of the pipeline on synthetic datasets and compares the measurements with a baseline
+def benchmark(arguments):
+    from m6.benchmark import load_baseline, print_table, regressions, run_benchmark, save_baseline
+
+    measurements = run_benchmark(arguments.rows, arguments.globules, arguments.repeat, arguments.max_values, arguments.data_dir, arguments.seed)
+    baseline = load_baseline(arguments.compare) if arguments.compare is not None else None
+    print_table(measurements, baseline, arguments.threshold)
+
+    if arguments.save_baseline is not None:
+        save_baseline(measurements, arguments.save_baseline)
+
+    if baseline is not None and regressions(measurements, baseline, arguments.threshold):
+        print(f"Steps slower than {arguments.threshold} times the baseline found", file=sys.stderr)
+        return 1
+
+    return 0
+
+# Prints the versions of m6, Python and the used packages and exits
+class VersionAction(argparse.Action):
+    def __init__(self, option_strings, dest, **kwargs):
+        super().__init__(option_strings, dest, nargs=0, help="print the versions of m6, Python, NumPy and pandas and exit")
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        from m6 import __version__
+        from m6.report import package_versions
+
+        sys.stdout.write(f"m6 version: {__version__}\n")
+        package_versions()
+        parser.exit()
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="m6", description="Experiment M6 - internal friction / Innere Reibung")
+    parser.add_argument("--version", action=VersionAction)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_run = subparsers.add_parser("run", help="evaluate a single dataset directory")
+    parser_run.add_argument("path_input", type=Path, help="directory, which contains the input files")
+    parser_run.add_argument("path_output", type=Path, help="directory, where the output files will be stored")
+    parser_run.add_argument("--stream", action="store_true", help="read the sinking times in chunks with bounded memory")
+    parser_run.add_argument("--chunk-rows", type=int, default=65536, help="rows per chunk in streaming mode (default: 65536)")
+    parser_run.add_argument("--incremental", action="store_true",
+                            help="read only the rows appended to sinkingtimes.csv since the last incremental run into this output directory")
+    parser_run.add_argument("--workers", type=int, default=None, help="number of worker processes for the Monte Carlo propagation (default: all cores)")
+    parser_run.add_argument("--fit-wall-correction", action="store_true",
+                            help="fit the dynamic viscosity and the Ladenburg wall coefficient to all globules, written to wall_correction_fit.json")
+    add_output_arguments(parser_run)
+    add_error_method_arguments(parser_run)
+    add_outlier_arguments(parser_run)
+    add_report_arguments(parser_run)
+    add_monte_carlo_arguments(parser_run)
+    add_cache_arguments(parser_run)
+    add_profile_arguments(parser_run)
+    add_constants_arguments(parser_run)
+    parser_run.set_defaults(function=run)
+
+    parser_batch = subparsers.add_parser("batch", help="evaluate many dataset directories across a process pool")
+    parser_batch.add_argument("path_output", type=Path, help="directory, where the outputs and the summary will be stored")
+    parser_batch.add_argument("--glob", action="append", default=[], help="glob pattern of dataset directories, can be repeated")
+    parser_batch.add_argument("--manifest", action="append", default=[], type=Path, help="file with one dataset directory per line, can be repeated")
+    parser_batch.add_argument("--workers", type=int, default=None, help="number of worker processes (default: all cores)")
+    parser_batch.add_argument("--fit-wall-correction", action="store_true",
+                              help="fit the dynamic viscosity and the Ladenburg wall coefficient of every dataset, added to the summary")
+    add_output_arguments(parser_batch)
+    add_error_method_arguments(parser_batch)
+    add_outlier_arguments(parser_batch)
+    add_monte_carlo_arguments(parser_batch)
+    add_cache_arguments(parser_batch)
+    parser_batch.add_argument("--verbosity", choices=["silent", "summary", "full"], default="summary",
+                              help="silent reports failing datasets only (default: summary)")
+    add_constants_arguments(parser_batch)
+    parser_batch.set_defaults(function=batch)
+
+    parser_convert = subparsers.add_parser("convert", help="convert a sinking times CSV file into a memory-mappable .npy file")
+    parser_convert.add_argument("location", type=Path, help="headerless sinking times CSV file")
+    parser_convert.add_argument("destination", type=Path, nargs="?", default=None, help=".npy file (default: next to the CSV file)")
+    parser_convert.add_argument("--chunk-rows", type=int, default=65536, help="rows per chunk while converting (default: 65536)")
+    parser_convert.set_defaults(function=convert)
+
+    parser_watch = subparsers.add_parser("watch", help="watch a dataset directory and update the results on every change")
+    parser_watch.add_argument("path_input", type=Path, help="directory, which contains the input files")
+    parser_watch.add_argument("path_output", type=Path, help="directory, where the output files will be stored")
+    parser_watch.add_argument("--debounce", type=float, default=0.005, help="seconds without events before an update (default: 0.005)")
+    parser_watch.add_argument("--polling", action="store_true", help="poll the input files instead of using inotify")
+    parser_watch.add_argument("--poll-interval", type=float, default=0.1, help="seconds between two polls (default: 0.1)")
+    parser_watch.add_argument("--port", type=int, default=None, help="serve the latest results as JSON on 127.0.0.1:PORT/results")
+    add_error_method_arguments(parser_watch)
+    add_report_arguments(parser_watch)
+    add_constants_arguments(parser_watch)
+    parser_watch.set_defaults(function=watch)
+
+    parser_serve = subparsers.add_parser("serve", help="evaluate submitted measurements over HTTP on 127.0.0.1")
+    parser_serve.add_argument("--port", type=int, default=8766, help="port on 127.0.0.1 (default: 8766)")
+    parser_serve.add_argument("--max-batch", type=int, default=256, help="maximum number of requests per batch (default: 256)")
+    parser_serve.add_argument("--batch-window", type=float, default=0.002,
+                              help="seconds to wait for further requests after the first one of a batch (default: 0.002)")
+    add_constants_arguments(parser_serve)
+    parser_serve.set_defaults(function=serve)
+
+    parser_sweep = subparsers.add_parser("sweep", help="evaluate many fluids and temperatures and fit the viscosity-temperature curves")
+    parser_sweep.add_argument("table", type=Path, help="CSV table with fluid, temperature, fluid_density, fluid_density_errorrange and path_input")
+    parser_sweep.add_argument("path_output", type=Path, help="directory, where the outputs, sweep.csv and viscosity_fits.json will be stored")
+    parser_sweep.add_argument("--fit", nargs="*", choices=["arrhenius", "vogel_fulcher"], default=["arrhenius", "vogel_fulcher"],
+                              help="models fitted per fluid (default: arrhenius vogel_fulcher)")
+    parser_sweep.add_argument("--fit-quantity", choices=["mean_ladenburg_dynamic_viscosity", "mean_dynamic_viscosity"],
+                              default="mean_ladenburg_dynamic_viscosity", help="viscosity the models are fitted to (default: mean_ladenburg_dynamic_viscosity)")
+    parser_sweep.add_argument("--verbosity", choices=["silent", "summary"], default="summary", help="silent or summary of the fits (default: summary)")
+    add_output_arguments(parser_sweep)
+    add_error_method_arguments(parser_sweep)
+    add_outlier_arguments(parser_sweep)
+    add_constants_arguments(parser_sweep)
+    parser_sweep.set_defaults(function=sweep)
+
+    parser_benchmark = subparsers.add_parser("benchmark", help="time every step of the pipeline on synthetic datasets")
+    parser_benchmark.add_argument("--rows", type=int, nargs="+", default=[10, 1000, 100000], help="series of measurements (default: 10 1000 100000)")
+    parser_benchmark.add_argument("--globules", type=int, nargs="+", default=[1, 10, 100], help="globule columns (default: 1 10 100)")
+    parser_benchmark.add_argument("--repeat", type=int, default=5, help="repetitions per dataset, the best time counts (default: 5)")
+    parser_benchmark.add_argument("--max-values", type=int, default=10 ** 7, help="skip datasets with more rows * globules (default: 10^7)")
+    parser_benchmark.add_argument("--data-dir", type=Path, default=None, help="keep the generated datasets here and reuse them (default: temporary)")
+    parser_benchmark.add_argument("--seed", type=int, default=0, help="seed of the dataset generator (default: 0)")
+    parser_benchmark.add_argument("--save-baseline", type=Path, default=None, help="save the measurements as baseline JSON file")
+    parser_benchmark.add_argument("--compare", type=Path, default=None, help="compare with a baseline and exit with 1 on regressions")
+    parser_benchmark.add_argument("--threshold", type=float, default=1.25,
+                                  help="ratio to the baseline, above which a step counts as regression (default: 1.25)")
+    parser_benchmark.set_defaults(function=benchmark)
+
+    return parser
+
+def main(argv=None):
+    arguments = build_parser().parse_args(argv)
+    return arguments.function(arguments)
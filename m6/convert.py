@@ -0,0 +1,46 @@
+'''
+description:                                Converts the headerless sinking times CSV file (rows = series, columns = globule
+                                            diameters) once into a raw float64 .npy file, which m6.reader memory-maps instead of
+                                            parsing the text again on every run. The CSV file is read in chunks and written
+                                            straight into the memory-mapped .npy file, so large files don't have to fit in memory.
+'''
+
+from pathlib import Path
+
+import numpy as np
+
+from m6.stream import DEFAULT_CHUNK_ROWS, read_chunks
+
+
+# Counts the non empty lines of a text file
+def count_rows(location):
+    rows = 0
+    with open(location, "rb") as file:
+        for line in file:
+            if line.strip():
+                rows += 1
+
+    return rows
+
+# Converts a sinking times CSV file into a .npy file and returns its location
+def convert_csv(location, destination=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    location = Path(location)
+    destination = Path(destination) if destination is not None else location.with_suffix(".npy")
+
+    rows = count_rows(location)
+    values = None
+    start = 0
+
+    for chunk in read_chunks(location, chunk_rows):
+        if values is None:
+            values = np.lib.format.open_memmap(destination, mode="w+", dtype=np.float64, shape=(rows, chunk.shape[1]))
+        values[start:start + chunk.shape[0]] = chunk
+        start += chunk.shape[0]
+
+    if values is None:
+        raise ValueError(f"{location} contains no measurements")
+
+    values.flush()
+    del values
+
+    return destination
@@ -0,0 +1,298 @@
+'''
+description:                                Side effect free core of the M6 pipeline. compute() takes the measured arrays and the
+                                            apparatus constants and returns all derived values in a Results object. Nothing is
+                                            read, written or printed here, see m6.reader, m6.writer and m6.report for that.
+
+Constants:                                  Apparatus constants and error ranges, all values in SI units. The defaults are the
+                                            values of the experiment M6 at the physics faculty at Humboldt University to Berlin.
+Measurements:                               Measured sinking times (rows = series, columns = globules) and the diameters,
+                                            densities and density error ranges of the globules (one value per globule).
+Results:                                    All values calculated by compute(). The arrays are preallocated once per run and
+                                            filled in place by the stages, which pass the Results object from stage to stage.
+                                            DataFrames are only built on demand by to_frame().
+'''
+
+import dataclasses
+from dataclasses import dataclass
+
+import numpy as np
+
+from m6 import engine, profiling
+
+
+@dataclass(frozen=True)
+class Constants:
+    cylinder_length: float = 0.20                   # in m
+    cylinder_length_errorrange: float = 0.0005      # in m
+    cylinder_diameter: float = 0.0635               # in m
+    cylinder_diameter_errorrange: float = 0.000005  # in m
+
+    globules_diameter_errorrange: float = 0.000005  # in m
+
+    g: float = 9.81235                              # in m/s^2
+    g_errorrange: float = 0.0001                    # in m/s^2
+
+    fluid_density: float = 965                      # in kg/m^3
+    fluid_density_errorrange: float = 0.5           # in kg/m^3
+
+
+@dataclass
+class Measurements:
+    sinkingtimes: np.ndarray
+    globules_diameters: np.ndarray
+    globules_density: np.ndarray
+    globules_density_errorranges: np.ndarray
+
+    def __post_init__(self):
+        self.sinkingtimes = np.atleast_2d(engine.as_array(self.sinkingtimes))
+        self.globules_diameters = engine.as_array(self.globules_diameters).reshape(-1)
+        self.globules_density = engine.as_array(self.globules_density).reshape(-1)
+        self.globules_density_errorranges = engine.as_array(self.globules_density_errorranges).reshape(-1)
+
+        globules = self.sinkingtimes.shape[1]
+        for name in ("globules_diameters", "globules_density", "globules_density_errorranges"):
+            if getattr(self, name).shape[0] != globules:
+                raise ValueError(f"{name} has {getattr(self, name).shape[0]} values, but there are {globules} globule columns in sinkingtimes")
+
+
+@dataclass
+class Results:
+    sinkingtimes_errorranges: np.ndarray
+    mean_sinkingtimes: np.ndarray
+    mean_sinkingtimes_errorranges: np.ndarray
+    velocities: np.ndarray
+    mean_velocities: np.ndarray
+    mean_velocities_errorranges: np.ndarray
+    dynamic_viscosity: np.ndarray
+    ladenburg_dynamic_viscosity: np.ndarray
+    dynamic_viscosity_errorranges: np.ndarray
+    ladenburg_dynamic_viscosity_errorranges: np.ndarray
+    mean_dynamic_viscosity: float
+    mean_ladenburg_dynamic_viscosity: float
+    mean_dynamic_viscosity_errorrange: float
+    mean_ladenburg_dynamic_viscosity_errorrange: float
+    kinematic_viscosity: float
+    kinematic_viscosity_errorrange: float
+    reynolds_number: np.ndarray
+    reynolds_number_errorrange: np.ndarray
+    rejected_sinkingtimes: np.ndarray = None        # set by the outlier rejection of m6.robust only
+
+    # Preallocates all arrays for the given number of series and globules
+    @classmethod
+    def allocate(cls, series, globules):
+        arrays = {}
+        for field in dataclasses.fields(cls):
+            if field.name in SCALAR_FIELDS:
+                arrays[field.name] = np.nan
+            elif field.name in OPTIONAL_FIELDS:
+                arrays[field.name] = None
+            elif field.name == "sinkingtimes_errorranges":
+                arrays[field.name] = np.empty((series, globules))
+            elif field.name == "velocities":
+                arrays[field.name] = np.empty((globules, series))
+            else:
+                arrays[field.name] = np.empty(globules)
+
+        return cls(**arrays)
+
+    # Results of the globules from start to stop as views of the arrays, the single values are left to be calculated
+    def globules(self, start, stop):
+        arrays = {}
+        for field in dataclasses.fields(self):
+            if field.name in SCALAR_FIELDS:
+                arrays[field.name] = np.nan
+            elif field.name in OPTIONAL_FIELDS:
+                values = getattr(self, field.name)
+                arrays[field.name] = values[:, start:stop] if values is not None else None
+            elif field.name == "sinkingtimes_errorranges":
+                arrays[field.name] = self.sinkingtimes_errorranges[:, start:stop]
+            else:
+                arrays[field.name] = getattr(self, field.name)[start:stop]
+
+        return type(self)(**arrays)
+
+    # Builds a DataFrame of a single result for the export, rows and columns like in the CSV files
+    def to_frame(self, name):
+        import pandas as pd
+
+        return pd.DataFrame(data = np.atleast_2d(getattr(self, name)))
+
+
+# Results stored as single value instead of an array
+SCALAR_FIELDS = tuple(field.name for field in dataclasses.fields(Results) if field.type in (float, "float"))
+
+# Results, which are None unless an optional stage calculates them
+OPTIONAL_FIELDS = ("rejected_sinkingtimes",)
+
+
+# Calculating error range for all measured times
+def stage_sinkingtimes_errorranges(m, c, r):
+    engine.sinkingtimes_errorranges(m.sinkingtimes, out=r.sinkingtimes_errorranges)
+
+# Calculate mean sinking times and their error ranges. The velocities aren't calculated yet, so their array is
+# borrowed as scratch space to keep the peak memory at the size of the result arrays.
+def stage_mean_sinkingtimes(m, c, r):
+    scratch = r.velocities.reshape(r.sinkingtimes_errorranges.shape)
+
+    engine.mean_values(m.sinkingtimes, out=r.mean_sinkingtimes)
+    engine.mean_sinkingtimes_errorranges(r.sinkingtimes_errorranges, out=r.mean_sinkingtimes_errorranges, scratch=scratch)
+
+# Calculate velocities for all value pairs
+def stage_velocities(m, c, r):
+    engine.velocities(c.cylinder_length, m.sinkingtimes, out=r.velocities)
+
+# Calculate mean velocities and their error ranges
+def stage_mean_velocities(m, c, r):
+    engine.mean_velocities(c.cylinder_length, r.mean_sinkingtimes, out=r.mean_velocities)
+    engine.mean_velocities_errorranges(c.cylinder_length_errorrange, r.mean_sinkingtimes, r.mean_sinkingtimes_errorranges, out=r.mean_velocities_errorranges)
+
+# Calculate dynamic viscosity by Stokes and Ladenburg in Pa * s
+def stage_dynamic_viscosity(m, c, r):
+    engine.dynamic_viscosity(m.globules_diameters, m.globules_density, r.mean_velocities, c.g, c.fluid_density, out=r.dynamic_viscosity)
+    engine.ladenburg_dynamic_viscosity(m.globules_diameters, m.globules_density, r.mean_velocities,
+                                       c.g, c.fluid_density, c.cylinder_diameter, out=r.ladenburg_dynamic_viscosity)
+
+# Calculate error ranges for dynamic viscosity by Stokes and Ladenburg in Pa * s
+def stage_dynamic_viscosity_errorranges(m, c, r):
+    engine.dynamic_viscosity_errorranges(m.globules_diameters, m.globules_density, m.globules_density_errorranges,
+                                         r.mean_velocities, r.mean_velocities_errorranges, c.g, c.g_errorrange,
+                                         c.fluid_density, c.fluid_density_errorrange, c.cylinder_diameter_errorrange,
+                                         out=r.dynamic_viscosity_errorranges)
+    engine.ladenburg_dynamic_viscosity_errorranges(m.globules_diameters, m.globules_density, m.globules_density_errorranges,
+                                                   r.mean_velocities, r.mean_velocities_errorranges, c.g, c.g_errorrange,
+                                                   c.fluid_density, c.fluid_density_errorrange, c.cylinder_diameter,
+                                                   c.cylinder_diameter_errorrange, c.globules_diameter_errorrange,
+                                                   out=r.ladenburg_dynamic_viscosity_errorranges)
+
+# Calculate mean dynamic viscosity by Stokes and Ladenburg and their error ranges by SEM
+def stage_mean_dynamic_viscosity(m, c, r):
+    r.mean_dynamic_viscosity = float(engine.mean_over_globules(r.dynamic_viscosity))
+    r.mean_ladenburg_dynamic_viscosity = float(engine.mean_over_globules(r.ladenburg_dynamic_viscosity))
+    r.mean_dynamic_viscosity_errorrange = float(engine.sem(r.mean_dynamic_viscosity, r.dynamic_viscosity))
+    r.mean_ladenburg_dynamic_viscosity_errorrange = float(engine.sem(r.mean_ladenburg_dynamic_viscosity, r.ladenburg_dynamic_viscosity))
+
+# Calculate kinematic viscosity
+def stage_kinematic_viscosity(m, c, r):
+    r.kinematic_viscosity = float(engine.kinematic_viscosity(r.mean_dynamic_viscosity, c.fluid_density))
+
+# Calculate error range for kinematic viscosity
+def stage_kinematic_viscosity_errorrange(m, c, r):
+    r.kinematic_viscosity_errorrange = float(engine.kinematic_viscosity_errorrange(r.mean_dynamic_viscosity, r.mean_dynamic_viscosity_errorrange,
+                                                                                   c.fluid_density, c.fluid_density_errorrange))
+
+# Calculate Reynolds number for all globules
+def stage_reynolds_number(m, c, r):
+    engine.reynolds_number(r.kinematic_viscosity, m.globules_diameters, r.dynamic_viscosity, c.fluid_density, out=r.reynolds_number)
+
+# Calculate error range for Reynolds numbers
+def stage_reynolds_number_errorrange(m, c, r):
+    engine.reynolds_number_errorrange(r.kinematic_viscosity, r.kinematic_viscosity_errorrange, m.globules_diameters,
+                                      r.dynamic_viscosity, r.dynamic_viscosity_errorranges, c.fluid_density,
+                                      c.fluid_density_errorrange, c.globules_diameter_errorrange, out=r.reynolds_number_errorrange)
+
+# Stages, which process every measured value, in the order of the pipeline
+ROW_STAGES = (
+    stage_sinkingtimes_errorranges,
+    stage_mean_sinkingtimes,
+    stage_velocities,
+)
+
+# Stages, which calculate every globule independently of the others, in the order of the pipeline
+COLUMN_STAGES = ROW_STAGES + (
+    stage_mean_velocities,
+    stage_dynamic_viscosity,
+    stage_dynamic_viscosity_errorranges,
+)
+
+# Stages, which combine the values of all globules of a dataset, in the order of the pipeline
+DATASET_STAGES = (
+    stage_mean_dynamic_viscosity,
+    stage_kinematic_viscosity,
+    stage_kinematic_viscosity_errorrange,
+    stage_reynolds_number,
+    stage_reynolds_number_errorrange,
+)
+
+# Stages, which only need the mean sinking times and their error ranges, in the order of the pipeline
+GLOBULE_STAGES = COLUMN_STAGES[3:] + DATASET_STAGES
+
+# All stages in the order of the pipeline
+STAGES = COLUMN_STAGES + DATASET_STAGES
+
+# minmax evaluates every formula at the upper and lower bound of all inputs, linear uses first-order error propagation
+ERROR_METHODS = ("minmax", "linear")
+
+
+# Returns the stages with the error range stages of the given method and the mean sinking times stage of the given
+# m6.robust.OutlierRejection, measured if a profiler is active
+def select_stages(stages, error_method="minmax", outliers=None):
+    if error_method not in ERROR_METHODS:
+        raise ValueError(f"error_method has to be one of {ERROR_METHODS}, not {error_method}")
+
+    replacements = {}
+    if error_method == "linear":
+        from m6 import linear
+
+        replacements.update({
+            stage_dynamic_viscosity_errorranges: linear.stage_dynamic_viscosity_errorranges,
+            stage_kinematic_viscosity_errorrange: linear.stage_kinematic_viscosity_errorrange,
+            stage_reynolds_number_errorrange: linear.stage_reynolds_number_errorrange,
+        })
+    if outliers is not None:
+        from m6 import robust
+
+        replacements[stage_mean_sinkingtimes] = robust.mean_sinkingtimes_stage(outliers)
+
+    stages = tuple(replacements.get(stage, stage) for stage in stages)
+
+    return profiling.instrument(stages, tuple(replacements.get(stage, stage) for stage in ROW_STAGES))
+
+
+# Calculates all values of experiment M6 for the given measurements, outliers of the sinking times are rejected by
+# the given m6.robust.OutlierRejection
+def compute(measurements, constants=Constants(), error_method="minmax", outliers=None):
+    results = Results.allocate(*measurements.sinkingtimes.shape)
+
+    for stage in select_stages(STAGES, error_method, outliers):
+        stage(measurements, constants, results)
+
+    return results
+
+# Constants for the column stages of datasets with different constants. Every field, which differs between the
+# datasets, becomes an array with the value of the dataset of every globule column.
+def column_constants(constants, globules):
+    values = {}
+    for field in dataclasses.fields(Constants):
+        column = [getattr(c, field.name) for c in constants]
+        values[field.name] = column[0] if all(value == column[0] for value in column) else np.repeat(column, globules)
+
+    return Constants(**values)
+
+# Calculates all values of many datasets with the same number of series at once, with the same constants or one
+# Constants object per dataset. The column stages run once on the globules of all datasets side by side, the dataset
+# stages run per dataset on its part of the results.
+def compute_batch(measurements, constants=Constants(), error_method="minmax", outliers=None):
+    if isinstance(constants, Constants):
+        constants = [constants] * len(measurements)
+
+    combined = Measurements(*(np.concatenate([getattr(m, field.name) for m in measurements], axis=-1)
+                              for field in dataclasses.fields(Measurements)))
+    results = Results.allocate(*combined.sinkingtimes.shape)
+
+    combined_constants = column_constants(constants, [m.sinkingtimes.shape[1] for m in measurements])
+    for stage in select_stages(COLUMN_STAGES, error_method, outliers):
+        stage(combined, combined_constants, results)
+
+    batch = []
+    start = 0
+    for m, c in zip(measurements, constants):
+        stop = start + m.sinkingtimes.shape[1]
+        r = results.globules(start, stop)
+
+        for stage in select_stages(DATASET_STAGES, error_method):
+            stage(m, c, r)
+
+        batch.append(r)
+        start = stop
+
+    return batch
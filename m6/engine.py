@@ -0,0 +1,128 @@
+'''
+description:                                Vectorized computation engine for experiment M6. Every stage of the pipeline is
+                                            evaluated as whole-array NumPy operation on contiguous float64 arrays. The formulas
+                                            keep the operation order of the original per-cell loops, so the results are
+                                            identical to them bit by bit.
+
+Array layout:                               times               2D array, rows = series of measurements, columns = globules
+                                            diameters           1D array, one value per globule
+                                            densities           1D array, one value per globule
+                                            density_errorranges 1D array, one value per globule
+
+out                                         Every stage accepts an optional preallocated array, which receives the result
+                                            instead of a newly allocated one. The stages with 2D results also accept a scratch
+                                            array of the shape of times for their intermediate values.
+'''
+
+import numpy as np
+
+
+# Converts any array like input to a contiguous float64 array
+def as_array(values):
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+# Sums along the first axis in the same order as a plain python loop. Reducing the first axis of a C-contiguous
+# array adds row by row, a 1D array is accumulated to keep numpy's pairwise summation out of the results.
+def sequential_sum(values, out=None):
+    if values.ndim == 1:
+        return np.add.accumulate(values)[-1]
+
+    return np.add.reduce(values, axis=0, out=out)
+
+# Calculating error range for single or all measured times
+def sinkingtimes_errorranges(times, out=None):
+    if out is None:
+        return 0.01 + 5 * pow(10, -4) * times
+
+    np.multiply(5 * pow(10, -4), times, out=out)
+    return np.add(0.01, out, out=out)
+
+# Calculate general mean values along the series of measurements
+def mean_values(values, out=None):
+    total = sequential_sum(values, out=out)
+    return np.divide(total, values.shape[0], out=out)
+
+# Calculate mean error ranges of the sinking times
+def mean_sinkingtimes_errorranges(errorranges, out=None, scratch=None):
+    items = errorranges.shape[0]
+    mean = mean_values(errorranges, out=out)
+
+    deviations = np.subtract(errorranges, mean, out=scratch)
+    binomic_parts = sequential_sum(np.square(deviations, out=deviations), out=out)
+
+    return np.sqrt(np.divide(np.divide(binomic_parts, items - 1, out=out), items, out=out), out=out)
+
+# Calculate velocities for all value pairs, rows represent the globules
+def velocities(cylinder_length, times, out=None):
+    if out is None:
+        return np.ascontiguousarray((cylinder_length / times).T)
+
+    return np.divide(cylinder_length, times.T, out=out)
+
+# Calculate mean velocities
+def mean_velocities(cylinder_length, mean_times, out=None):
+    return np.divide(cylinder_length, mean_times, out=out)
+
+# Calculate error range of mean velocities
+def mean_velocities_errorranges(cylinder_length_errorrange, mean_times, mean_times_errorranges, out=None):
+    return np.sqrt(np.square(cylinder_length_errorrange / mean_times) + np.square(mean_times_errorranges / np.square(mean_times)), out=out)
+
+# Calculate dynamic viscosity in Pa * s
+def dynamic_viscosity(diameters, densities, mean_velocities, g, fluid_density, out=None):
+    return np.multiply(((2 * np.square(diameters / 2)) / 9) * g, (densities - fluid_density) / mean_velocities, out=out)
+
+# Calculate Ladenburg dynamic viscosity in Pa * s
+def ladenburg_dynamic_viscosity(diameters, densities, mean_velocities, g, fluid_density, cylinder_diameter, out=None):
+    return np.multiply(((2 * np.square(diameters / 2)) / 9) * g,
+                       (densities - fluid_density) / (mean_velocities * (1 + 2.1 * (diameters / cylinder_diameter))), out=out)
+
+# Calculate error ranges for dynamic viscosity in Pa * s
+def dynamic_viscosity_errorranges(diameters, densities, density_errorranges, mean_velocities, mean_velocities_errorranges,
+                                  g, g_errorrange, fluid_density, fluid_density_errorrange, cylinder_diameter_errorrange, out=None):
+    max_level = (2/9) * (g + g_errorrange) * np.square((diameters + cylinder_diameter_errorrange) / 2) * (((densities + density_errorranges) - (fluid_density + fluid_density_errorrange)) / (mean_velocities + mean_velocities_errorranges))
+    min_level = (2/9) * (g - g_errorrange) * np.square((diameters - cylinder_diameter_errorrange) / 2) * (((densities - density_errorranges) - (fluid_density - fluid_density_errorrange)) / (mean_velocities - mean_velocities_errorranges))
+
+    return np.divide(max_level - min_level, 2, out=out)
+
+# Calculate error ranges for Ladenburg dynamic viscosity in Pa * s
+def ladenburg_dynamic_viscosity_errorranges(diameters, densities, density_errorranges, mean_velocities, mean_velocities_errorranges,
+                                            g, g_errorrange, fluid_density, fluid_density_errorrange,
+                                            cylinder_diameter, cylinder_diameter_errorrange, globules_diameter_errorrange, out=None):
+    max_level = (2/9) * (g + g_errorrange) * np.square((diameters + cylinder_diameter_errorrange) / 2) * (((densities + density_errorranges) - (fluid_density + fluid_density_errorrange)) / ((mean_velocities + mean_velocities_errorranges) * (1 + 2.1 * ((diameters + globules_diameter_errorrange) / (cylinder_diameter + cylinder_diameter_errorrange)))))
+    min_level = (2/9) * (g - g_errorrange) * np.square((diameters - cylinder_diameter_errorrange) / 2) * (((densities - density_errorranges) - (fluid_density - fluid_density_errorrange)) / ((mean_velocities - mean_velocities_errorranges) * (1 + 2.1 * ((diameters - globules_diameter_errorrange) / (cylinder_diameter - cylinder_diameter_errorrange)))))
+
+    return np.divide(max_level - min_level, 2, out=out)
+
+# Calculate mean value over all globules
+def mean_over_globules(values):
+    return sequential_sum(values) / values.shape[0]
+
+# Calculate SEM of a mean value over all globules
+def sem(mean, values):
+    items = values.shape[0]
+    binomic_parts = sequential_sum(np.square(values - mean))
+
+    return np.sqrt((binomic_parts / (items - 1)) / items) / np.sqrt(items)
+
+# Calculate kinematic viscosity
+def kinematic_viscosity(mean_dynamic_viscosity, fluid_density):
+    return mean_dynamic_viscosity / fluid_density
+
+# Calculate error range for kinematic viscosity
+def kinematic_viscosity_errorrange(mean_dynamic_viscosity, mean_dynamic_viscosity_errorrange, fluid_density, fluid_density_errorrange):
+    max_level = (mean_dynamic_viscosity + mean_dynamic_viscosity_errorrange) / (fluid_density + fluid_density_errorrange)
+    min_level = (mean_dynamic_viscosity - mean_dynamic_viscosity_errorrange) / (fluid_density - fluid_density_errorrange)
+
+    return (max_level - min_level) / 2
+
+# Calculate Reynolds number for all globules
+def reynolds_number(kinematic_viscosity, diameters, dynamic_viscosity, fluid_density, out=None):
+    return np.divide(kinematic_viscosity * (diameters / 2) * fluid_density, dynamic_viscosity, out=out)
+
+# Calculate error range for Reynolds numbers
+def reynolds_number_errorrange(kinematic_viscosity, kinematic_viscosity_errorrange, diameters, dynamic_viscosity, dynamic_viscosity_errorranges,
+                               fluid_density, fluid_density_errorrange, globules_diameter_errorrange, out=None):
+    max_level = ((kinematic_viscosity + kinematic_viscosity_errorrange) * ((diameters / 2) + globules_diameter_errorrange) * (fluid_density + fluid_density_errorrange)) / (dynamic_viscosity + dynamic_viscosity_errorranges)
+    min_level = ((kinematic_viscosity - kinematic_viscosity_errorrange) * ((diameters / 2) - globules_diameter_errorrange) * (fluid_density - fluid_density_errorrange)) / (dynamic_viscosity - dynamic_viscosity_errorranges)
+
+    return np.divide(max_level - min_level, 2, out=out)
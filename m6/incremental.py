@@ -0,0 +1,149 @@
+'''
+description:                                Incremental mode for sinking time files, which grow by appended rows during a lab
+                                            session. The per-column running state (count, sum, mean and M2 of the sinking times and
+                                            their error ranges) of the previous run is stored in the output directory together with
+                                            the byte offset, up to which sinkingtimes.csv was read. An update reads only the rows
+                                            behind this offset, merges them into the running state and recomputes the per globule
+                                            stages, so its cost scales with the number of new rows.
+
+Appended rows:                              Only complete lines are read, a last line without line break is left for the next
+                                            update, as it may still be written. If the already read part of the file changed
+                                            (checked by its size and a hash of the last TAIL_BYTES bytes before the offset) or
+                                            the number of globules changed, the state is rebuilt from the start of the file.
+
+Outputs:                                    The new rows of the sinking time error ranges are appended to
+                                            sinkingtimes_errorranges.csv in place and all per globule and single values are
+                                            rewritten. The length of sinkingtimes_errorranges.csv after the append is stored in
+                                            the state, the next update cuts the file back to it, so rows of an update, which
+                                            crashed before its state was stored, aren't appended twice. A shorter file rebuilds
+                                            the state.
+                                            velocities.csv isn't maintained, as its rows represent the globules and every update
+                                            would rewrite the whole file. The mean sinking times are identical to the full
+                                            computation, the SEM matches it up to rounding, see m6.stream.
+'''
+
+import hashlib
+import io
+import os
+from pathlib import Path
+
+import numpy as np
+
+from m6 import engine, profiling
+from m6.core import GLOBULE_STAGES, Constants, Results, select_stages
+from m6.reader import (FILENAME_GLOBULES_DENSITY, FILENAME_GLOBULES_DENSITY_ERRORRANGES, FILENAME_GLOBULES_DIAMETERS,
+                       FILENAME_SINKINGTIMES, read_csv, read_globules)
+from m6.stream import ROW_FIELDS, RunningStatistics
+from m6.writer import CSV_FILES, write_csv_results, write_csv_rows
+
+STATE_FILENAME = "incremental_state.npz"
+ERRORRANGES_FILENAME = "sinkingtimes_errorranges.csv"
+TAIL_BYTES = 65536
+
+
+# Hash of the last TAIL_BYTES bytes before the offset
+def tail_hash(file, offset):
+    start = max(0, offset - TAIL_BYTES)
+    file.seek(start)
+
+    return hashlib.blake2b(file.read(offset - start), digest_size=16).hexdigest()
+
+# Loads the running state, None if there is none or it doesn't belong to the current file or the written sinking time
+# error ranges anymore
+def load_state(location, file, globules, errorranges_location):
+    if not location.exists():
+        return None
+
+    with np.load(location) as arrays:
+        if "errorranges_bytes" not in arrays:
+            return None
+
+        offset = int(arrays["offset"])
+        errorranges_bytes = int(arrays["errorranges_bytes"])
+        if int(arrays["globules"]) != globules or os.fstat(file.fileno()).st_size < offset or str(arrays["tail_hash"]) != tail_hash(file, offset):
+            return None
+        if not errorranges_location.exists() or errorranges_location.stat().st_size < errorranges_bytes:
+            return None
+
+        return offset, errorranges_bytes, RunningStatistics.from_arrays(arrays, "times_"), RunningStatistics.from_arrays(arrays, "errorranges_")
+
+# Stores the running state atomically
+def store_state(location, offset, file, globules, errorranges_bytes, times_statistics, errorranges_statistics):
+    buffer = io.BytesIO()
+    np.savez(buffer, offset=offset, globules=globules, tail_hash=tail_hash(file, offset), errorranges_bytes=errorranges_bytes,
+             **times_statistics.to_arrays("times_"), **errorranges_statistics.to_arrays("errorranges_"))
+
+    temporary = location.with_suffix(".tmp")
+    temporary.write_bytes(buffer.getvalue())
+    os.replace(temporary, location)
+
+# Reads the complete lines behind the offset, returns them as float64 array and the new offset
+def read_appended_rows(file, offset, globules):
+    with profiling.step("read " + Path(file.name).name) as measured:
+        file.seek(offset)
+        data = file.read()
+        end = data.rfind(b"\n") + 1
+        measured.bytes_read = len(data)
+
+        rows = read_csv(io.BytesIO(data[:end])) if data[:end].strip() else np.empty((0, globules))
+        measured.elements = rows.size
+
+    return rows, offset + end
+
+# Updates the results with the rows appended since the last update and returns them with the number of new rows.
+# The returned Results contain no rows for the sinking time error ranges and velocities.
+def update(path_input, path_output, constants=Constants(), error_method="minmax",
+           filename_sinkingtimes=FILENAME_SINKINGTIMES,
+           filename_globules_diameters=FILENAME_GLOBULES_DIAMETERS,
+           filename_globules_density=FILENAME_GLOBULES_DENSITY,
+           filename_globules_density_errorranges=FILENAME_GLOBULES_DENSITY_ERRORRANGES):
+    path_input = Path(path_input)
+    path_output = Path(path_output)
+    location = path_input / filename_sinkingtimes
+
+    if location.suffix != ".csv":
+        raise ValueError(f"the incremental mode needs the sinking times as CSV file, not {location.name}")
+
+    measurements = read_globules(path_input, filename_globules_diameters, filename_globules_density, filename_globules_density_errorranges)
+    globules = measurements.globules_diameters.shape[0]
+    state_location = path_output / STATE_FILENAME
+    errorranges_location = path_output / ERRORRANGES_FILENAME
+
+    with open(location, "rb") as file:
+        state = load_state(state_location, file, globules, errorranges_location)
+        if state is None:
+            offset, errorranges_bytes, times_statistics, errorranges_statistics = 0, 0, RunningStatistics(globules), RunningStatistics(globules)
+        else:
+            offset, errorranges_bytes, times_statistics, errorranges_statistics = state
+
+        rows, offset = read_appended_rows(file, offset, globules)
+        if rows.shape[1] != globules:
+            raise ValueError(f"{filename_globules_diameters} has {globules} values, but there are {rows.shape[1]} globule columns in {filename_sinkingtimes}")
+
+        with profiling.step("running_statistics", rows.size):
+            errorranges = engine.sinkingtimes_errorranges(rows)
+            times_statistics.update(rows)
+            errorranges_statistics.update(errorranges)
+
+        # Rows behind the stored length were appended by an update, which didn't store its state, and are cut off
+        if state is not None:
+            os.truncate(errorranges_location, errorranges_bytes)
+        with open(errorranges_location, "w" if state is None else "a") as errorranges_file:
+            write_csv_rows(errorranges_file, errorranges)
+        errorranges_bytes = errorranges_location.stat().st_size
+
+        store_state(state_location, offset, file, globules, errorranges_bytes, times_statistics, errorranges_statistics)
+
+    if times_statistics.count == 0:
+        raise ValueError(f"{filename_sinkingtimes} contains no measurements")
+
+    results = Results.allocate(0, globules)
+    results.mean_sinkingtimes[:] = times_statistics.means()
+    results.mean_sinkingtimes_errorranges[:] = errorranges_statistics.sem()
+
+    for stage in select_stages(GLOBULE_STAGES, error_method):
+        stage(measurements, constants, results)
+
+    write_csv_results(results, path_output, fields=[field for _, field in CSV_FILES if field not in ROW_FIELDS])
+
+    return results, rows.shape[0]
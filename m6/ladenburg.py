@@ -0,0 +1,154 @@
+'''
+description:                                Fit of the Ladenburg wall correction. Instead of the fixed factor 1 + 2.1 * d/D the
+                                            dynamic viscosity and the wall coefficient k are fitted to the mean velocities of all
+                                            globules of a dataset by weighted least squares.
+
+Model:                                      v = 2/9 * g * (d/2)^2 * (rho - rho_fluid) / (eta * (1 + k * d/D))
+                                            is linear in d/D for the Stokes dynamic viscosity of every globule:
+                                                eta_stokes = 2/9 * g * (d/2)^2 * (rho - rho_fluid) / v = eta + eta * k * d/D
+                                            The straight line is fitted with the error ranges of the Stokes dynamic viscosity as
+                                            uncertainties, eta is its intercept and k its slope divided by the intercept. The
+                                            covariance of eta and k follows from the one of intercept and slope by the Jacobian
+                                            of k = slope / intercept.
+
+Batch:                                      The normal equations of a straight line are solved in closed form from five weighted
+                                            sums per dataset. The sums of many datasets, whose globules lie side by side, are
+                                            taken by np.add.reduceat, so thousands of datasets are fitted in one vectorized pass.
+                                            Datasets with fewer than two different diameters give NaN.
+'''
+
+import dataclasses
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+WALL_CORRECTION_FILENAME = "wall_correction_fit.json"
+
+
+@dataclass
+class WallCorrectionFit:
+    dynamic_viscosity: float            # in Pa * s
+    dynamic_viscosity_errorrange: float
+    wall_coefficient: float
+    wall_coefficient_errorrange: float
+    covariance: np.ndarray              # of dynamic viscosity and wall coefficient
+    chi2: float
+    dof: int
+
+
+# Weighted straight line fits of values = intercept + slope * x for the datasets starting at the given indices. Returns
+# intercepts, slopes, their covariance matrices and chi^2.
+def fit_lines(x, values, errorranges, starts):
+    weights = 1 / np.square(errorranges)
+
+    s = np.add.reduceat(weights, starts)
+    sx = np.add.reduceat(weights * x, starts)
+    sxx = np.add.reduceat(weights * np.square(x), starts)
+    sy = np.add.reduceat(weights * values, starts)
+    sxy = np.add.reduceat(weights * x * values, starts)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        determinant = s * sxx - np.square(sx)
+        intercepts = (sxx * sy - sx * sxy) / determinant
+        slopes = (s * sxy - sx * sy) / determinant
+
+        covariance = np.empty((s.shape[0], 2, 2))
+        covariance[:, 0, 0] = sxx / determinant
+        covariance[:, 1, 1] = s / determinant
+        covariance[:, 0, 1] = covariance[:, 1, 0] = -sx / determinant
+
+    segments = np.repeat(np.arange(s.shape[0]), np.diff(np.append(starts, x.shape[0])))
+    chi2 = np.add.reduceat(weights * np.square(values - intercepts[segments] - slopes[segments] * x), starts)
+
+    return intercepts, slopes, covariance, chi2
+
+# Fits the dynamic viscosity and the wall coefficient of many datasets at once. diameters, Stokes dynamic viscosities
+# and their error ranges of all datasets lie side by side, starts are the indices of the first globule of every dataset
+# and cylinder_diameter is a single value or one value per globule. Returns one WallCorrectionFit with an array per field.
+def fit_wall_correction_arrays(diameters, dynamic_viscosity, dynamic_viscosity_errorranges, cylinder_diameter, starts):
+    starts = np.asarray(starts, dtype=np.intp)
+    intercepts, slopes, line_covariance, chi2 = fit_lines(diameters / cylinder_diameter, dynamic_viscosity, dynamic_viscosity_errorranges, starts)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        coefficients = slopes / intercepts
+
+        jacobian = np.zeros((intercepts.shape[0], 2, 2))
+        jacobian[:, 0, 0] = 1
+        jacobian[:, 1, 0] = -slopes / np.square(intercepts)
+        jacobian[:, 1, 1] = 1 / intercepts
+        covariance = jacobian @ line_covariance @ np.swapaxes(jacobian, 1, 2)
+
+    counts = np.diff(np.append(starts, diameters.shape[0]))
+    invalid = np.maximum.reduceat(diameters, starts) <= np.minimum.reduceat(diameters, starts)
+    intercepts[invalid] = coefficients[invalid] = chi2[invalid] = np.nan
+    covariance[invalid] = np.nan
+
+    return WallCorrectionFit(
+        dynamic_viscosity=intercepts,
+        dynamic_viscosity_errorrange=np.sqrt(covariance[:, 0, 0]),
+        wall_coefficient=coefficients,
+        wall_coefficient_errorrange=np.sqrt(covariance[:, 1, 1]),
+        covariance=covariance,
+        chi2=chi2,
+        dof=counts - 2,
+    )
+
+# Fits the dynamic viscosity and the wall coefficient of every dataset to its results, constants can be one Constants
+# object or one per dataset
+def fit_wall_correction_batch(measurements, results, constants):
+    if not isinstance(constants, (list, tuple)):
+        constants = [constants] * len(measurements)
+
+    counts = [m.globules_diameters.shape[0] for m in measurements]
+    fits = fit_wall_correction_arrays(
+        np.concatenate([m.globules_diameters for m in measurements]),
+        np.concatenate([r.dynamic_viscosity for r in results]),
+        np.concatenate([r.dynamic_viscosity_errorranges for r in results]),
+        np.repeat([c.cylinder_diameter for c in constants], counts),
+        np.cumsum([0] + counts[:-1]),
+    )
+
+    return [WallCorrectionFit(**{field.name: getattr(fits, field.name)[i] for field in dataclasses.fields(WallCorrectionFit)})
+            for i in range(0, len(measurements))]
+
+# Fits the dynamic viscosity and the wall coefficient of a single dataset to its results
+def fit_wall_correction(measurements, results, constants):
+    fit = fit_wall_correction_batch([measurements], [results], constants)[0]
+
+    return WallCorrectionFit(
+        dynamic_viscosity=float(fit.dynamic_viscosity),
+        dynamic_viscosity_errorrange=float(fit.dynamic_viscosity_errorrange),
+        wall_coefficient=float(fit.wall_coefficient),
+        wall_coefficient_errorrange=float(fit.wall_coefficient_errorrange),
+        covariance=fit.covariance,
+        chi2=float(fit.chi2),
+        dof=int(fit.dof),
+    )
+
+# Converts a fit to plain lists and floats for JSON, the NaN values of a degenerate fit become None
+def fit_to_dict(fit):
+    from m6.writer import json_values
+
+    return {field.name: json_values(getattr(fit, field.name)) for field in dataclasses.fields(WallCorrectionFit)}
+
+# Writes the fit of a dataset as JSON into the output directory
+def write_wall_correction(fit, path_output):
+    location = Path(path_output) / WALL_CORRECTION_FILENAME
+    location.write_text(json.dumps(fit_to_dict(fit), indent=1, allow_nan=False))
+
+    return location
+
+# Formats the fit for the console
+def format_wall_correction(fit, log_format="text"):
+    from m6.report import headline
+
+    if log_format == "json":
+        return json.dumps({"quantity": "wall_correction_fit", **fit_to_dict(fit)}, allow_nan=False) + "\n"
+
+    return (headline("fitted Ladenburg wall correction")
+            + f"dynamic viscosity : {fit.dynamic_viscosity!r} +- {fit.dynamic_viscosity_errorrange!r}\n"
+            f"wall coefficient : {fit.wall_coefficient!r} +- {fit.wall_coefficient_errorrange!r}\n"
+            f"covariance : {np.asarray(fit.covariance).tolist()!r}\n"
+            f"chi2 : {fit.chi2!r} | dof : {fit.dof}\n")
@@ -0,0 +1,99 @@
+'''
+description:                                First-order (Gaussian) error propagation for experiment M6. The uncertainties of the
+                                            Stokes and Ladenburg dynamic viscosity, the kinematic viscosity and the Reynolds numbers
+                                            are calculated with the closed-form partial derivatives of their formulas in one
+                                            vectorized pass, instead of evaluating every formula at the upper and lower bound of
+                                            all inputs. The inputs are treated as independent, the error ranges as standard
+                                            deviations.
+
+Relative uncertainties:                     Stokes      eta = 2/9 * g * (d/2)^2 * (rho - rho_fluid) / v
+                                                        (s_eta/eta)^2 = (s_g/g)^2 + (2 s_d/d)^2 + (s_rho^2 + s_rho_fluid^2)/(rho - rho_fluid)^2 + (s_v/v)^2
+                                            Ladenburg   eta_L = eta / W with W = 1 + 2.1 * d/D
+                                                        d gets the derivative 2/d - 2.1/(D W), D the derivative 2.1 d/(D^2 W)
+                                            kinematic   nu = eta_mean / rho_fluid
+                                                        (s_nu/nu)^2 = (s_eta_mean/eta_mean)^2 + (s_rho_fluid/rho_fluid)^2
+                                            Reynolds    Re = nu * d/2 * rho_fluid / eta
+                                                        (s_Re/Re)^2 = (s_nu/nu)^2 + (s_d/d)^2 + (s_rho_fluid/rho_fluid)^2 + (s_eta/eta)^2
+
+                                            s_d is the error range of the globule diameters, s_v the error range of the mean
+                                            velocities and s_eta_mean the SEM of the mean dynamic viscosity, like in m6.core.
+
+Usage:                                      compute(measurements, constants, error_method="linear")
+'''
+
+import numpy as np
+
+
+# Relative uncertainty of the Stokes dynamic viscosity without the diameter part
+def relative_common_errorranges(densities, density_errorranges, mean_velocities, mean_velocities_errorranges,
+                                g, g_errorrange, fluid_density, fluid_density_errorrange):
+    density_difference = densities - fluid_density
+
+    return (np.square(g_errorrange / g)
+            + (np.square(density_errorranges) + fluid_density_errorrange ** 2) / np.square(density_difference)
+            + np.square(mean_velocities_errorranges / mean_velocities))
+
+# Calculate error ranges for dynamic viscosity in Pa * s
+def dynamic_viscosity_errorranges(dynamic_viscosity, diameters, densities, density_errorranges, mean_velocities, mean_velocities_errorranges,
+                                  g, g_errorrange, fluid_density, fluid_density_errorrange, globules_diameter_errorrange, out=None):
+    relative = relative_common_errorranges(densities, density_errorranges, mean_velocities, mean_velocities_errorranges,
+                                           g, g_errorrange, fluid_density, fluid_density_errorrange)
+    relative += np.square(2 * globules_diameter_errorrange / diameters)
+
+    return np.multiply(np.abs(dynamic_viscosity), np.sqrt(relative), out=out)
+
+# Calculate error ranges for Ladenburg dynamic viscosity in Pa * s
+def ladenburg_dynamic_viscosity_errorranges(ladenburg_dynamic_viscosity, diameters, densities, density_errorranges,
+                                            mean_velocities, mean_velocities_errorranges, g, g_errorrange,
+                                            fluid_density, fluid_density_errorrange, cylinder_diameter, cylinder_diameter_errorrange,
+                                            globules_diameter_errorrange, out=None):
+    wall_correction = 1 + 2.1 * (diameters / cylinder_diameter)
+
+    relative = relative_common_errorranges(densities, density_errorranges, mean_velocities, mean_velocities_errorranges,
+                                           g, g_errorrange, fluid_density, fluid_density_errorrange)
+    relative += np.square((2 / diameters - 2.1 / (cylinder_diameter * wall_correction)) * globules_diameter_errorrange)
+    relative += np.square(2.1 * diameters / (cylinder_diameter ** 2 * wall_correction) * cylinder_diameter_errorrange)
+
+    return np.multiply(np.abs(ladenburg_dynamic_viscosity), np.sqrt(relative), out=out)
+
+# Calculate error range for kinematic viscosity
+def kinematic_viscosity_errorrange(kinematic_viscosity, mean_dynamic_viscosity, mean_dynamic_viscosity_errorrange,
+                                   fluid_density, fluid_density_errorrange):
+    return abs(kinematic_viscosity) * np.sqrt((mean_dynamic_viscosity_errorrange / mean_dynamic_viscosity) ** 2
+                                              + (fluid_density_errorrange / fluid_density) ** 2)
+
+# Calculate error range for Reynolds numbers
+def reynolds_number_errorrange(reynolds_number, kinematic_viscosity, kinematic_viscosity_errorrange, diameters,
+                               dynamic_viscosity, dynamic_viscosity_errorranges, fluid_density, fluid_density_errorrange,
+                               globules_diameter_errorrange, out=None):
+    relative = (np.square(globules_diameter_errorrange / diameters)
+                + np.square(dynamic_viscosity_errorranges / dynamic_viscosity)
+                + (kinematic_viscosity_errorrange / kinematic_viscosity) ** 2
+                + (fluid_density_errorrange / fluid_density) ** 2)
+
+    return np.multiply(np.abs(reynolds_number), np.sqrt(relative), out=out)
+
+
+# Stage replacing core.stage_dynamic_viscosity_errorranges
+def stage_dynamic_viscosity_errorranges(m, c, r):
+    dynamic_viscosity_errorranges(r.dynamic_viscosity, m.globules_diameters, m.globules_density, m.globules_density_errorranges,
+                                  r.mean_velocities, r.mean_velocities_errorranges, c.g, c.g_errorrange,
+                                  c.fluid_density, c.fluid_density_errorrange, c.globules_diameter_errorrange,
+                                  out=r.dynamic_viscosity_errorranges)
+    ladenburg_dynamic_viscosity_errorranges(r.ladenburg_dynamic_viscosity, m.globules_diameters, m.globules_density, m.globules_density_errorranges,
+                                            r.mean_velocities, r.mean_velocities_errorranges, c.g, c.g_errorrange,
+                                            c.fluid_density, c.fluid_density_errorrange, c.cylinder_diameter,
+                                            c.cylinder_diameter_errorrange, c.globules_diameter_errorrange,
+                                            out=r.ladenburg_dynamic_viscosity_errorranges)
+
+# Stage replacing core.stage_kinematic_viscosity_errorrange
+def stage_kinematic_viscosity_errorrange(m, c, r):
+    r.kinematic_viscosity_errorrange = float(kinematic_viscosity_errorrange(r.kinematic_viscosity, r.mean_dynamic_viscosity,
+                                                                            r.mean_dynamic_viscosity_errorrange,
+                                                                            c.fluid_density, c.fluid_density_errorrange))
+
+# Stage replacing core.stage_reynolds_number_errorrange
+def stage_reynolds_number_errorrange(m, c, r):
+    reynolds_number_errorrange(r.reynolds_number, r.kinematic_viscosity, r.kinematic_viscosity_errorrange, m.globules_diameters,
+                               r.dynamic_viscosity, r.dynamic_viscosity_errorranges, c.fluid_density, c.fluid_density_errorrange,
+                               c.globules_diameter_errorrange, out=r.reynolds_number_errorrange)
@@ -0,0 +1,70 @@
+'''
+description:                                Evaluates one dataset directory: reads the measurements, computes the results and
+                                            propagates the uncertainties by Monte Carlo, using the result cache if one is given.
+                                            Used by the command line interface, the batch mode and main.py.
+'''
+
+from pathlib import Path
+
+from m6 import profiling
+from m6.core import Constants, compute
+from m6.reader import (FILENAME_GLOBULES_DENSITY, FILENAME_GLOBULES_DENSITY_ERRORRANGES, FILENAME_GLOBULES_DIAMETERS,
+                       FILENAME_SINKINGTIMES, read_measurements, sinkingtimes_location)
+
+
+# Locations of the four input files of a dataset
+def input_files(path_input,
+                filename_sinkingtimes=FILENAME_SINKINGTIMES,
+                filename_globules_diameters=FILENAME_GLOBULES_DIAMETERS,
+                filename_globules_density=FILENAME_GLOBULES_DENSITY,
+                filename_globules_density_errorranges=FILENAME_GLOBULES_DENSITY_ERRORRANGES):
+    path_input = Path(path_input)
+
+    return (
+        sinkingtimes_location(path_input / filename_sinkingtimes),
+        path_input / filename_globules_diameters,
+        path_input / filename_globules_density,
+        path_input / filename_globules_density_errorranges,
+    )
+
+# Returns the results and the Monte Carlo results (None if monte_carlo_samples is 0) of a dataset
+def evaluate(path_input, constants=Constants(), error_method="minmax", monte_carlo_samples=0, seed=0, distribution="normal",
+             workers=1, cache=None, filenames=(), outliers=None):
+    files = input_files(path_input, *filenames)
+    measurements = None
+    results = None
+    monte_carlo = None
+
+    if cache is not None:
+        from m6.cache import dataset_key
+
+        with profiling.step("cache lookup"):
+            key = dataset_key(files, constants, error_method=error_method, outliers=outliers)
+            results = cache.load_results(key)
+
+    if results is None:
+        measurements = read_measurements(path_input, *filenames)
+        results = compute(measurements, constants, error_method, outliers)
+        if cache is not None:
+            with profiling.step("cache store"):
+                cache.store_results(key, results)
+
+    if monte_carlo_samples > 0:
+        from m6.montecarlo import propagate
+
+        if cache is not None:
+            with profiling.step("cache lookup"):
+                monte_carlo_key = dataset_key(files, constants, error_method=error_method, outliers=outliers, samples=monte_carlo_samples,
+                                              seed=seed, distribution=distribution)
+                monte_carlo = cache.load_monte_carlo(monte_carlo_key)
+
+        if monte_carlo is None:
+            if measurements is None:
+                measurements = read_measurements(path_input, *filenames)
+            with profiling.step("monte_carlo", monte_carlo_samples * measurements.globules_diameters.shape[0]):
+                monte_carlo = propagate(measurements, constants, results, monte_carlo_samples, seed, distribution, workers=workers)
+            if cache is not None:
+                with profiling.step("cache store"):
+                    cache.store_monte_carlo(monte_carlo_key, monte_carlo)
+
+    return results, monte_carlo
@@ -0,0 +1,208 @@
+'''
+description:                                Per step instrumentation of the M6 pipeline. Every stage of m6.core, every read of an
+                                            input file, every write of an output file, the cache lookups and the Monte Carlo
+                                            propagation record their wall time, the number of processed elements and the bytes
+                                            of I/O on the active Profiler.
+
+                                                profiler = Profiler()
+                                                with profiling(profiler):
+                                                    results = compute(measurements)
+                                                print_profile(profiler)
+
+Overhead:                                   Without an active profiler, instrument() returns the stages unchanged and step()
+                                            returns a shared do-nothing context manager, so the pipeline runs like before.
+
+Capture:                                    cprofile    additionally runs cProfile while the profiler is active, the statistics
+                                                        can be dumped to a file for pstats or snakeviz
+                                            tracemalloc additionally traces the allocations and records the peak memory
+                                                        allocated during every step
+'''
+
+import contextlib
+import dataclasses
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+PROFILE_FORMATS = ("table", "json")
+CAPTURE_MODES = ("cprofile", "tracemalloc")
+
+
+@dataclass
+class StepStatistics:
+    calls: int = 0
+    seconds: float = 0.0
+    elements: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0
+    peak_bytes: int = 0
+
+
+class Profiler:
+    def __init__(self, capture=None):
+        if capture is not None and capture not in CAPTURE_MODES:
+            raise ValueError(f"capture has to be one of {CAPTURE_MODES}, not {capture}")
+
+        self.capture = capture
+        self.steps = {}
+        self.started = time.perf_counter()
+        self.stopped = None
+        self.cprofile = None
+
+    # Adds a finished step
+    def record(self, name, seconds, elements=0, bytes_read=0, bytes_written=0, peak_bytes=0):
+        statistics = self.steps.get(name)
+        if statistics is None:
+            statistics = self.steps[name] = StepStatistics()
+
+        statistics.calls += 1
+        statistics.seconds += seconds
+        statistics.elements += elements
+        statistics.bytes_read += bytes_read
+        statistics.bytes_written += bytes_written
+        statistics.peak_bytes = max(statistics.peak_bytes, peak_bytes)
+
+    # Wall time from the creation of the profiler until it was stopped or until now
+    def total_seconds(self):
+        return (self.stopped or time.perf_counter()) - self.started
+
+    def to_dict(self):
+        return {
+            "total_seconds": self.total_seconds(),
+            "capture": self.capture,
+            "steps": [{"step": name, **dataclasses.asdict(statistics)} for name, statistics in self.steps.items()],
+        }
+
+
+# Active profiler of this process, set by profiling()
+current = None
+
+
+class Step:
+    def __init__(self, profiler, name, elements=0, bytes_read=0, bytes_written=0):
+        self.profiler = profiler
+        self.name = name
+        self.elements = elements
+        self.bytes_read = bytes_read
+        self.bytes_written = bytes_written
+
+    def __enter__(self):
+        if self.profiler.capture == "tracemalloc":
+            tracemalloc.reset_peak()
+            self.traced = tracemalloc.get_traced_memory()[0]
+
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        seconds = time.perf_counter() - self.start
+        peak_bytes = tracemalloc.get_traced_memory()[1] - self.traced if self.profiler.capture == "tracemalloc" else 0
+
+        self.profiler.record(self.name, seconds, self.elements, self.bytes_read, self.bytes_written, peak_bytes)
+
+
+class DisabledStep:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        pass
+
+    # Elements and bytes set by the measured code are dropped
+    def __setattr__(self, name, value):
+        pass
+
+
+DISABLED_STEP = DisabledStep()
+
+
+# Activates a profiler and its capture mode for the with block
+@contextlib.contextmanager
+def profiling(profiler):
+    global current
+
+    previous = current
+    current = profiler
+
+    if profiler.capture == "tracemalloc":
+        tracemalloc.start()
+    elif profiler.capture == "cprofile":
+        import cProfile
+
+        profiler.cprofile = cProfile.Profile()
+        profiler.cprofile.enable()
+
+    try:
+        yield profiler
+    finally:
+        if profiler.capture == "tracemalloc":
+            tracemalloc.stop()
+        elif profiler.capture == "cprofile":
+            profiler.cprofile.disable()
+
+        profiler.stopped = time.perf_counter()
+        current = previous
+
+# Measures a step on the active profiler. Elements and bytes, which are only known at the end of the step, can be set
+# on the returned object inside the with block.
+def step(name, elements=0, bytes_read=0, bytes_written=0):
+    if current is None:
+        return DISABLED_STEP
+
+    return Step(current, name, elements, bytes_read, bytes_written)
+
+# Name of a stage of the pipeline
+def step_name(stage):
+    return stage.__name__.removeprefix("stage_")
+
+# Wraps a stage, so it is measured. Row stages process every measured value, all other stages one value per globule.
+def measured_stage(stage, row_stage):
+    name = step_name(stage)
+
+    def measured(m, c, r):
+        with step(name, m.sinkingtimes.size if row_stage else m.globules_diameters.shape[0]):
+            stage(m, c, r)
+
+    return measured
+
+# Returns the stages wrapped by measured_stage() if a profiler is active and unchanged otherwise
+def instrument(stages, row_stages=()):
+    if current is None:
+        return stages
+
+    return tuple(measured_stage(stage, stage in row_stages) for stage in stages)
+
+# Formats the steps as table with their share of the total wall time
+def format_table(profiler):
+    total = profiler.total_seconds()
+    tracing = profiler.capture == "tracemalloc"
+
+    lines = [f"{'step':<52} {'calls':>6} {'seconds':>10} {'share':>6} {'elements':>11} {'elements/s':>11} {'read MiB':>9} {'written MiB':>11}"
+             + (f" {'peak MiB':>9}" if tracing else "")]
+    for name, s in profiler.steps.items():
+        rate = s.elements / s.seconds if s.seconds > 0 and s.elements else 0
+        lines.append(f"{name:<52} {s.calls:>6} {s.seconds:>10.6f} {s.seconds / total:>6.1%} {s.elements:>11} {rate:>11.4g} "
+                     f"{s.bytes_read / 2 ** 20:>9.3f} {s.bytes_written / 2 ** 20:>11.3f}" + (f" {s.peak_bytes / 2 ** 20:>9.3f}" if tracing else ""))
+
+    accounted = sum(s.seconds for s in profiler.steps.values())
+    lines.append(f"{'other':<52} {'':>6} {total - accounted:>10.6f} {(total - accounted) / total:>6.1%}")
+    lines.append(f"{'total':<52} {'':>6} {total:>10.6f}")
+
+    return "\n".join(lines) + "\n"
+
+# Prints the profile as table or JSON, with cProfile also the functions with the highest cumulative time
+def print_profile(profiler, profile_format="table", stream=None, cprofile_limit=20):
+    stream = stream or sys.stderr
+
+    if profile_format == "json":
+        stream.write(json.dumps(profiler.to_dict()) + "\n")
+    else:
+        stream.write(format_table(profiler))
+        if profiler.cprofile is not None:
+            import pstats
+
+            pstats.Stats(profiler.cprofile, stream=stream).sort_stats("cumulative").print_stats(cprofile_limit)
+
+    stream.flush()
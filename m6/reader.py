@@ -0,0 +1,164 @@
+'''
+description:                                Reads the input CSV files of experiment M6 into a Measurements object. The values have
+                                            to be comma separated and the files should not have a header. Rows represent the series
+                                            of measurements, columns represent the different globule diameters.
+
+Binary sinking times:                       The sinking times can also be given as raw float64 .npy file with the same layout,
+                                            see m6.convert. It is memory-mapped and goes into the computation without a copy.
+                                            A sinkingtimes.npy next to sinkingtimes.csv is used instead of the CSV file, as long
+                                            as it isn't older than the CSV file.
+
+pandas:                                     The plain headerless format is parsed by NumPy, pandas is optional and only imported
+                                            for files NumPy can't parse, like files with missing values.
+                                            NumPy rounds every number correctly to the nearest float64, like pandas.read_csv with
+                                            float_precision="round_trip". The default fast parser of pandas, which was used
+                                            before, isn't correctly rounded. For numbers with up to 14 significant digits
+                                            both agree, numbers with full float64 precision can differ by 1 ulp and with them
+                                            all outputs in the last digits.
+'''
+
+import dataclasses
+import json
+import os
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+from m6 import engine, profiling
+from m6.core import OPTIONAL_FIELDS, SCALAR_FIELDS, Measurements, Results
+from m6.writer import PARQUET_METADATA_KEY
+
+FILENAME_SINKINGTIMES                 = "sinkingtimes.csv"
+FILENAME_GLOBULES_DIAMETERS           = "globules_diameters.csv"
+FILENAME_GLOBULES_DENSITY             = "globules_density.csv"
+FILENAME_GLOBULES_DENSITY_ERRORRANGES = "globules_density_errorranges.csv"
+
+
+# Reads a headerless CSV file or text buffer into a float64 array, rows and columns like pandas.read_csv(header=None)
+def read_csv(location):
+    if not isinstance(location, (str, os.PathLike)):
+        return parse_csv(location)
+
+    with profiling.step("read " + Path(location).name, bytes_read=os.path.getsize(location)) as measured:
+        values = parse_csv(location)
+        measured.elements = values.size
+
+    return values
+
+# Parses a headerless CSV file or text buffer, see read_csv()
+def parse_csv(location):
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            values = np.loadtxt(location, delimiter=",", ndmin=2)
+    except ValueError:
+        try:
+            import pandas as pd
+        except ImportError:
+            raise ValueError(f"{location} isn't a plain CSV file of numbers, reading it needs pandas") from None
+
+        if hasattr(location, "seek"):
+            location.seek(0)
+        return engine.as_array(pd.read_csv(location, header=None))
+
+    if values.size == 0:
+        raise ValueError(f"{location} contains no values")
+
+    return engine.as_array(values)
+
+# Memory-maps a float64 .npy file with the sinking times
+def read_npy(location):
+    with profiling.step("read " + Path(location).name) as measured:
+        values = np.load(location, mmap_mode="r")
+        measured.elements = values.size
+        measured.bytes_read = values.nbytes
+
+    if values.dtype != np.float64 or values.ndim != 2 or not values.flags.c_contiguous:
+        raise ValueError(f"{location} has to contain a C-contiguous 2D float64 array, found {values.ndim}D {values.dtype}")
+
+    return values
+
+# Returns the binary sinking times file, which replaces the given CSV file, or the CSV file itself
+def sinkingtimes_location(location):
+    location = Path(location)
+    if location.suffix == ".npy":
+        return location
+
+    binary = location.with_suffix(".npy")
+    if binary.exists() and (not location.exists() or binary.stat().st_mtime >= location.stat().st_mtime):
+        return binary
+
+    return location
+
+# Reads the sinking times from a CSV or .npy file
+def read_sinkingtimes(location):
+    location = sinkingtimes_location(location)
+
+    if location.suffix == ".npy":
+        return read_npy(location)
+
+    return read_csv(location)
+
+# Reads all input files of one dataset
+def read_measurements(path_input,
+                      filename_sinkingtimes=FILENAME_SINKINGTIMES,
+                      filename_globules_diameters=FILENAME_GLOBULES_DIAMETERS,
+                      filename_globules_density=FILENAME_GLOBULES_DENSITY,
+                      filename_globules_density_errorranges=FILENAME_GLOBULES_DENSITY_ERRORRANGES):
+    path_input = Path(path_input)
+
+    return Measurements(
+        sinkingtimes=read_sinkingtimes(path_input / filename_sinkingtimes),
+        globules_diameters=read_csv(path_input / filename_globules_diameters)[0],
+        globules_density=read_csv(path_input / filename_globules_density)[0],
+        globules_density_errorranges=read_csv(path_input / filename_globules_density_errorranges)[0],
+    )
+
+# Reads the globule input files of one dataset, the returned Measurements contain no sinking times
+def read_globules(path_input,
+                  filename_globules_diameters=FILENAME_GLOBULES_DIAMETERS,
+                  filename_globules_density=FILENAME_GLOBULES_DENSITY,
+                  filename_globules_density_errorranges=FILENAME_GLOBULES_DENSITY_ERRORRANGES):
+    path_input = Path(path_input)
+    globules_diameters = read_csv(path_input / filename_globules_diameters)[0]
+
+    return Measurements(
+        sinkingtimes=np.empty((0, globules_diameters.shape[0])),
+        globules_diameters=globules_diameters,
+        globules_density=read_csv(path_input / filename_globules_density)[0],
+        globules_density_errorranges=read_csv(path_input / filename_globules_density_errorranges)[0],
+    )
+
+# Reads the consolidated results file written by m6.writer in the format parquet, npz or hdf5, optional results, which
+# weren't written, are None
+def read_results(location):
+    location = Path(location)
+    names = [field.name for field in dataclasses.fields(Results)]
+
+    if location.suffix == ".npz":
+        with np.load(location) as archive:
+            values = {name: archive[name] for name in names if name in archive}
+    elif location.suffix == ".h5":
+        import h5py
+
+        with h5py.File(location, "r") as file:
+            values = {name: file[name][()] for name in names if name in file}
+    else:
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(location)
+        values = json.loads(table.schema.metadata[PARQUET_METADATA_KEY])
+        for name in names:
+            if name in values or name not in table.column_names:
+                continue
+            column = table.column(name).to_pylist()
+            values[name] = np.array(column, dtype=bool) if name in OPTIONAL_FIELDS else engine.as_array(column)
+        for name in ("sinkingtimes_errorranges", "rejected_sinkingtimes"):
+            if name in values:
+                values[name] = np.ascontiguousarray(values[name].T)
+
+    for name in SCALAR_FIELDS:
+        values[name] = float(values[name])
+
+    return Results(**values)
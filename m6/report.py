@@ -0,0 +1,157 @@
+'''
+description:                                Reports the results of experiment M6 to the console or a log file. The lines of a
+                                            result are formatted as a whole and written with one call to a buffered stream, so
+                                            no print call runs per value.
+
+verbosity                                   silent  nothing is reported
+                                            summary only the single values like the mean viscosities and their error ranges
+                                            full    every computed value, like the original console output
+log_format                                  text    headlines and "Col | Row : value" lines
+                                            json    JSON lines, one object per value with quantity, col, row and value,
+                                                    NaN and infinite values are null
+'''
+
+import json
+import math
+import sys
+
+import numpy as np
+
+from m6.core import SCALAR_FIELDS
+
+VERBOSITY_LEVELS = ("silent", "summary", "full")
+LOG_FORMATS = ("text", "json")
+
+# Headline and the matching field of Results, in the order of the pipeline
+HEADLINES = (
+    ("sinking times error ranges",                   "sinkingtimes_errorranges"),
+    ("mean sinking times",                           "mean_sinkingtimes"),
+    ("mean sinking times error ranges",              "mean_sinkingtimes_errorranges"),
+    ("Velocities",                                   "velocities"),
+    ("mean velocities",                              "mean_velocities"),
+    ("mean velocities error range",                  "mean_velocities_errorranges"),
+    ("Dynamic Viscosity",                            "dynamic_viscosity"),
+    ("Ladenburg dynamic viscosity",                  "ladenburg_dynamic_viscosity"),
+    ("dynamic viscosity error ranges",               "dynamic_viscosity_errorranges"),
+    ("Ladenburg dynamic viscosity error ranges",     "ladenburg_dynamic_viscosity_errorranges"),
+    ("mean dynamic viscosity",                       "mean_dynamic_viscosity"),
+    ("mean ladenburg dynamic viscosity",             "mean_ladenburg_dynamic_viscosity"),
+    ("mean dynamic viscosity error range",           "mean_dynamic_viscosity_errorrange"),
+    ("mean ladenburg dynamic viscosity error range", "mean_ladenburg_dynamic_viscosity_errorrange"),
+    ("kinematic viscosity",                          "kinematic_viscosity"),
+    ("kinematic viscosity error range",              "kinematic_viscosity_errorrange"),
+    ("Reynolds number",                              "reynolds_number"),
+    ("Reynolds number error range",                  "reynolds_number_errorrange"),
+)
+
+
+# Version of an installed package, read from its metadata without importing it
+def package_version(name):
+    from importlib import metadata
+
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return "not installed"
+
+# Print versions of used packages
+def package_versions(stream=None):
+    stream = stream or sys.stdout
+    stream.write("Python version: " + sys.version + "\n" + "NumPy version: " + np.__version__ + "\n"
+                 + "Pandas version: " + package_version("pandas") + "\n")
+
+# Formats a headline
+def headline(headline):
+    return " \n---------------------------------------------\n" + headline + "\n---------------------------------------------\n"
+
+# Yields col, row and value of a single value or of all values of a result array
+def cells(values):
+    values = np.atleast_1d(values)
+
+    if values.ndim == 1:
+        for i, value in enumerate(values.tolist()):
+            yield i, 0, value
+        return
+
+    for i, row in enumerate(values.tolist()):
+        for j, value in enumerate(row):
+            yield i, j, value
+
+# Formats all values of a result as text lines
+def format_text(title, values):
+    return headline(title) + "".join(f"Col {i} | Row {j} : {value!r}\n" for i, j, value in cells(values))
+
+# Value for a JSON line, NaN and infinite values become null like in m6.writer.json_values, as JSON has no literal for them
+def json_value(value):
+    return value if math.isfinite(value) else None
+
+# Formats all values of a result as JSON lines
+def format_json(field, values):
+    return "".join(json.dumps({"quantity": field, "col": i, "row": j, "value": json_value(value)}, allow_nan=False) + "\n"
+                   for i, j, value in cells(values))
+
+# Reports the results with the given verbosity and format
+def print_results(results, verbosity="full", log_format="text", stream=None):
+    if verbosity == "silent":
+        return
+
+    stream = stream or sys.stdout
+
+    for title, field in HEADLINES:
+        if verbosity == "summary" and field not in SCALAR_FIELDS:
+            continue
+
+        if log_format == "json":
+            stream.write(format_json(field, getattr(results, field)))
+        else:
+            stream.write(format_text(title, getattr(results, field)))
+
+    if results.rejected_sinkingtimes is not None:
+        stream.write(format_rejected(results, log_format))
+
+    stream.flush()
+
+# Formats the rejected sinking times of the outlier rejection, even in the summary, so no dataset has to be checked by hand
+def format_rejected(results, log_format="text"):
+    rejected = np.argwhere(results.rejected_sinkingtimes).tolist()
+
+    if log_format == "json":
+        return "".join(json.dumps({"quantity": "rejected_sinkingtimes", "col": i, "row": j, "value": True}, allow_nan=False) + "\n"
+                       for i, j in rejected)
+
+    return (headline(f"rejected sinking times ({len(rejected)} of {results.rejected_sinkingtimes.size})")
+            + "".join(f"Col {i} | Row {j} : rejected\n" for i, j in rejected))
+
+# Reports mean, standard deviation and percentiles of the Monte Carlo quantities, summary reports the single values only
+def print_monte_carlo(monte_carlo, verbosity="full", log_format="text", stream=None):
+    from m6.montecarlo import PERCENTILES
+
+    if verbosity == "silent":
+        return
+
+    stream = stream or sys.stdout
+
+    for name, distribution in monte_carlo.quantities.items():
+        scalar = np.ndim(distribution.mean) == 0
+        if verbosity == "summary" and not scalar:
+            continue
+
+        means = np.atleast_1d(distribution.mean).tolist()
+        stds = np.atleast_1d(distribution.std).tolist()
+        percentiles = distribution.percentiles.reshape(len(PERCENTILES), -1).T.tolist()
+
+        if log_format == "json":
+            stream.write("".join(json.dumps({"quantity": name, "col": i, "samples": monte_carlo.samples, "mean": json_value(means[i]),
+                                             "std": json_value(stds[i]),
+                                             "percentiles": {str(percentile): json_value(value) for percentile, value in zip(PERCENTILES, percentiles[i])}},
+                                            allow_nan=False) + "\n"
+                                 for i in range(0, len(means))))
+            continue
+
+        lines = [headline(f"Monte Carlo {name.replace('_', ' ')} ({monte_carlo.samples} samples)")]
+        for i in range(0, len(means)):
+            bounds = " | ".join(f"P{percentile:g} : {value!r}" for percentile, value in zip(PERCENTILES, percentiles[i]))
+            lines.append(f"Col {i} | mean : {means[i]!r} | std : {stds[i]!r} | {bounds}\n")
+        stream.write("".join(lines))
+
+    stream.flush()
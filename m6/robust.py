@@ -0,0 +1,200 @@
+'''
+description:                                Optional outlier rejection for experiment M6. Replaces the mean sinking times stage of
+                                            m6.core: the sinking times of all globule columns are tested in one vectorized pass,
+                                            the rejected measurements are left out of the mean sinking times and their error
+                                            ranges and are marked in Results.rejected_sinkingtimes. All following values, the
+                                            viscosities, the kinematic viscosity and the Reynolds numbers, are calculated from
+                                            the means of the accepted measurements.
+
+Methods:                                    grubbs      two-sided Grubbs test of the most extreme sinking time of every globule,
+                                                        threshold is the significance level (default 0.05)
+                                            chauvenet   Chauvenet's criterion, a sinking time is rejected if fewer than threshold
+                                                        measurements of the series are expected as far from the mean (default 0.5)
+                                            mad         modified z-score by median and median absolute deviation, sinking times
+                                                        beyond the threshold are rejected (default 3.5)
+                                            weighted    nothing is rejected, the mean sinking times are weighted by the inverse
+                                                        square of the sinking time error ranges and their error range is the one of
+                                                        the weighted mean, 1 / sqrt(sum of the weights)
+
+                                            Without rejected measurements the means are identical to the ones of m6.core.
+
+Usage:                                      compute(measurements, constants, outliers=OutlierRejection("mad"))
+'''
+
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from m6 import engine
+
+OUTLIER_METHODS = ("grubbs", "chauvenet", "mad", "weighted")
+
+DEFAULT_THRESHOLDS = {
+    "grubbs":    0.05,
+    "chauvenet": 0.5,
+    "mad":       3.5,
+    "weighted":  None,
+}
+
+MAD_SCALE = 0.6745                  # median absolute deviation of the standard normal distribution
+STUDENT_T_SERIES_DOF = 1000         # above, the quantiles of Student's t distribution are approximated by Cornish-Fisher
+
+
+@dataclass(frozen=True)
+class OutlierRejection:
+    method: str = "mad"
+    threshold: float = None         # None takes the default threshold of the method
+
+    def __post_init__(self):
+        if self.method not in OUTLIER_METHODS:
+            raise ValueError(f"outlier method has to be one of {OUTLIER_METHODS}, not {self.method}")
+        if self.threshold is None:
+            object.__setattr__(self, "threshold", DEFAULT_THRESHOLDS[self.method])
+
+
+# Finds x with tail(x) == probability for a decreasing tail probability by bisection
+def inverse_tail(tail, probability):
+    low, high = 0.0, 1.0
+    while tail(high) > probability:
+        low, high = high, 2 * high
+
+    for _ in range(0, 100):
+        middle = (low + high) / 2
+        if tail(middle) > probability:
+            low = middle
+        else:
+            high = middle
+
+    return (low + high) / 2
+
+# Probability of |Z| > z for the standard normal distribution
+def normal_two_sided_tail(z):
+    return math.erfc(z / math.sqrt(2))
+
+# Probability of |T| > t for Student's t distribution with an integer number of degrees of freedom, closed form series
+# of Abramowitz and Stegun 26.7.3 and 26.7.4
+def student_t_two_sided_tail(t, dof):
+    theta = math.atan(t / math.sqrt(dof))
+    cos_square = math.cos(theta) ** 2
+
+    term = total = 1.0
+    if dof % 2 == 1:
+        for k in range(1, (dof - 3) // 2 + 1):
+            term *= cos_square * (2 * k) / (2 * k + 1)
+            total += term
+        inside = 2 / math.pi * (theta + (math.sin(theta) * math.cos(theta) * total if dof > 1 else 0))
+    else:
+        for k in range(1, (dof - 2) // 2 + 1):
+            term *= cos_square * (2 * k - 1) / (2 * k)
+            total += term
+        inside = math.sin(theta) * total
+
+    return 1 - inside
+
+# t with a probability of |T| > t for Student's t distribution
+def student_t_quantile(probability, dof):
+    if dof <= STUDENT_T_SERIES_DOF:
+        return inverse_tail(lambda t: student_t_two_sided_tail(t, dof), probability)
+
+    z = inverse_tail(normal_two_sided_tail, probability)
+    return (z + (z ** 3 + z) / (4 * dof) + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * dof ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * dof ** 3))
+
+# Critical value of the two-sided Grubbs test for n values
+def grubbs_critical_value(n, alpha):
+    t = student_t_quantile(alpha / n, n - 2)
+    return (n - 1) / math.sqrt(n) * math.sqrt(t ** 2 / (n - 2 + t ** 2))
+
+# Largest |z| accepted by Chauvenet's criterion for n values
+def chauvenet_critical_value(n, criterion):
+    return inverse_tail(normal_two_sided_tail, criterion / n)
+
+# Rejects the most extreme sinking time of every globule, if it fails the Grubbs test
+def reject_grubbs(times, alpha):
+    rejected = np.zeros(times.shape, dtype=bool)
+    n = times.shape[0]
+    if n < 3:
+        return rejected
+
+    deviations = np.abs(times - times.mean(axis=0))
+    extreme = np.argmax(deviations, axis=0)
+    std = times.std(axis=0, ddof=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        statistic = deviations[extreme, np.arange(times.shape[1])] / std
+    columns = np.flatnonzero((std > 0) & (statistic > grubbs_critical_value(n, alpha)))
+    rejected[extreme[columns], columns] = True
+
+    return rejected
+
+# Rejects all sinking times, which fail Chauvenet's criterion
+def reject_chauvenet(times, criterion):
+    n = times.shape[0]
+    if n < 3:
+        return np.zeros(times.shape, dtype=bool)
+
+    std = times.std(axis=0, ddof=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.abs(times - times.mean(axis=0)) / std
+
+    return (std > 0) & (z > chauvenet_critical_value(n, criterion))
+
+# Rejects all sinking times with a modified z-score beyond the threshold
+def reject_mad(times, threshold):
+    median = np.median(times, axis=0)
+    deviations = np.abs(times - median)
+    mad = np.median(deviations, axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = MAD_SCALE * deviations / mad
+
+    return (mad > 0) & (z > threshold)
+
+REJECTORS = {
+    "grubbs":    reject_grubbs,
+    "chauvenet": reject_chauvenet,
+    "mad":       reject_mad,
+}
+
+# Calculate mean values of the accepted values along the series of measurements
+def accepted_mean_values(values, rejected, out=None):
+    accepted = values.shape[0] - np.count_nonzero(rejected, axis=0)
+    total = engine.sequential_sum(np.where(rejected, 0.0, values), out=out)
+
+    return np.divide(total, accepted, out=out)
+
+# Calculate mean error ranges of the accepted sinking times
+def accepted_mean_sinkingtimes_errorranges(errorranges, rejected, out=None):
+    items = errorranges.shape[0] - np.count_nonzero(rejected, axis=0)
+    mean = accepted_mean_values(errorranges, rejected, out=out)
+
+    deviations = np.where(rejected, 0.0, errorranges - mean)
+    binomic_parts = engine.sequential_sum(np.square(deviations, out=deviations), out=out)
+
+    return np.sqrt(np.divide(np.divide(binomic_parts, items - 1, out=out), items, out=out), out=out)
+
+# Calculate mean sinking times weighted by the inverse square of their error ranges
+def weighted_mean_values(values, errorranges, out=None):
+    weights = 1 / np.square(errorranges)
+    return np.divide(engine.sequential_sum(weights * values), engine.sequential_sum(weights), out=out)
+
+# Calculate error ranges of the weighted mean sinking times
+def weighted_mean_errorranges(errorranges, out=None):
+    return np.divide(1, np.sqrt(engine.sequential_sum(1 / np.square(errorranges))), out=out)
+
+
+# Stage replacing core.stage_mean_sinkingtimes for the given outlier rejection
+def mean_sinkingtimes_stage(outliers):
+    def stage_mean_sinkingtimes(m, c, r):
+        if outliers.method == "weighted":
+            r.rejected_sinkingtimes = np.zeros(m.sinkingtimes.shape, dtype=bool)
+            weighted_mean_values(m.sinkingtimes, r.sinkingtimes_errorranges, out=r.mean_sinkingtimes)
+            weighted_mean_errorranges(r.sinkingtimes_errorranges, out=r.mean_sinkingtimes_errorranges)
+            return
+
+        r.rejected_sinkingtimes = REJECTORS[outliers.method](m.sinkingtimes, outliers.threshold)
+        accepted_mean_values(m.sinkingtimes, r.rejected_sinkingtimes, out=r.mean_sinkingtimes)
+        accepted_mean_sinkingtimes_errorranges(r.sinkingtimes_errorranges, r.rejected_sinkingtimes, out=r.mean_sinkingtimes_errorranges)
+
+    return stage_mean_sinkingtimes
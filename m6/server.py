@@ -0,0 +1,246 @@
+'''
+description:                                Local HTTP service, which evaluates submitted measurements with the pipeline of
+                                            m6.core. Requests, which arrive within batch_window seconds, are coalesced: all
+                                            datasets with the same constants, error method and number of series are evaluated
+                                            together by compute_batch(), so the column stages run once per batch instead of once
+                                            per request. The server binds to 127.0.0.1 only and needs nothing but the standard
+                                            library and NumPy.
+
+POST /compute                               JSON    {"sinkingtimes": [[...], ...], "globules_diameters": [...],
+                                                     "globules_density": [...], "globules_density_errorranges": [...],
+                                                     "constants": {"fluid_density": 965, ...}, "error_method": "minmax"}
+                                                    constants and error_method are optional, missing constants are the ones
+                                                    of the server
+                                            NPZ     Content-Type application/x-npz, an archive of np.savez with the same
+                                                    arrays, constants as single values named like the fields of Constants
+                                                    and error_method as string array
+                                            The results are returned as JSON object with one entry per field of Results, or
+                                            as NPZ archive if the Accept header contains application/x-npz.
+GET /metrics                                Number of requests, batches and errors, mean batch size, throughput since the
+                                            start and percentiles of the latency of the last LATENCY_WINDOW requests.
+'''
+
+import asyncio
+import collections
+import dataclasses
+import io
+import json
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from m6.core import ERROR_METHODS, Constants, Measurements, compute_batch
+from m6.writer import encode_npz, results_to_dict
+
+DEFAULT_PORT = 8766
+DEFAULT_MAX_BATCH = 256
+DEFAULT_BATCH_WINDOW = 0.002    # in s
+LATENCY_WINDOW = 10000
+MAX_BODY_BYTES = 256 * 1024 * 1024
+NPZ_CONTENT_TYPE = "application/x-npz"
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class Metrics:
+    started: float = dataclasses.field(default_factory=time.monotonic)
+    requests: int = 0
+    batches: int = 0
+    errors: int = 0
+    latencies: collections.deque = dataclasses.field(default_factory=lambda: collections.deque(maxlen=LATENCY_WINDOW))
+
+    # Counts a finished request with its latency in seconds
+    def record(self, latency):
+        self.requests += 1
+        self.latencies.append(latency)
+
+    def to_dict(self):
+        uptime = time.monotonic() - self.started
+        latencies = np.fromiter(self.latencies, dtype=np.float64) * 1000
+        percentiles = np.percentile(latencies, [50, 90, 99]).tolist() if latencies.size else [None] * 3
+
+        return {
+            "uptime_s": uptime,
+            "requests": self.requests,
+            "batches": self.batches,
+            "errors": self.errors,
+            "mean_batch_size": self.requests / self.batches if self.batches else None,
+            "throughput_per_s": self.requests / uptime if uptime > 0 else None,
+            "latency_ms": dict(zip(("p50", "p90", "p99"), percentiles)),
+        }
+
+
+# Creates the measurements, constants and error method of a JSON request
+def parse_json(body, constants):
+    try:
+        payload = json.loads(body)
+        measurements = Measurements(*(payload[field.name] for field in dataclasses.fields(Measurements)))
+        constants = dataclasses.replace(constants, **{name: float(value) for name, value in payload.get("constants", {}).items()})
+        error_method = str(payload.get("error_method", "minmax"))
+    except (ValueError, KeyError, TypeError, AttributeError) as error:
+        raise RequestError(400, f"invalid JSON measurements: {error!r}")
+
+    return measurements, constants, error_method
+
+# Creates the measurements, constants and error method of an NPZ request
+def parse_npz(body, constants):
+    try:
+        with np.load(io.BytesIO(body), allow_pickle=False) as arrays:
+            measurements = Measurements(*(arrays[field.name] for field in dataclasses.fields(Measurements)))
+            constants = dataclasses.replace(constants, **{field.name: float(arrays[field.name])
+                                                           for field in dataclasses.fields(Constants) if field.name in arrays})
+            error_method = str(arrays["error_method"]) if "error_method" in arrays else "minmax"
+    except Exception as error:
+        raise RequestError(400, f"invalid NPZ measurements: {error!r}")
+
+    return measurements, constants, error_method
+
+
+class Server:
+    def __init__(self, constants=Constants(), max_batch=DEFAULT_MAX_BATCH, batch_window=DEFAULT_BATCH_WINDOW):
+        self.constants = constants
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.metrics = Metrics()
+        self.queue = asyncio.Queue()
+
+    # Queues a dataset for the next batch and waits for its results
+    async def evaluate(self, measurements, constants, error_method):
+        if error_method not in ERROR_METHODS:
+            raise RequestError(400, f"error_method has to be one of {ERROR_METHODS}, not {error_method}")
+
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((measurements, constants, error_method, future))
+
+        return await future
+
+    # Collects the queued datasets into batches and evaluates every group of compatible datasets at once in a thread,
+    # so the event loop keeps accepting requests for the next batch meanwhile
+    async def run_batches(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            pending = [await self.queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(pending) < self.max_batch:
+                try:
+                    pending.append(await asyncio.wait_for(self.queue.get(), max(0, deadline - loop.time())))
+                except asyncio.TimeoutError:
+                    break
+
+            groups = collections.defaultdict(list)
+            for item in pending:
+                measurements, constants, error_method, _ = item
+                groups[(constants, error_method, measurements.sinkingtimes.shape[0])].append(item)
+
+            for (constants, error_method, _), items in groups.items():
+                self.metrics.batches += 1
+                try:
+                    batch = await loop.run_in_executor(None, compute_batch, [item[0] for item in items], constants, error_method)
+                except Exception as error:
+                    for item in items:
+                        if not item[3].done():
+                            item[3].set_exception(RequestError(400 if isinstance(error, ValueError) else 500, repr(error)))
+                    continue
+
+                # Futures of clients, which disconnected meanwhile, are cancelled already
+                for item, results in zip(items, batch):
+                    if not item[3].done():
+                        item[3].set_result(results)
+
+    # Answers a single request and returns status, content type and body
+    async def respond(self, method, path, headers, body):
+        if path == "/metrics":
+            if method != "GET":
+                raise RequestError(405, "use GET for /metrics")
+            return 200, "application/json", json.dumps(self.metrics.to_dict()).encode()
+
+        if path != "/compute":
+            raise RequestError(404, f"unknown path {path}")
+        if method != "POST":
+            raise RequestError(405, "use POST for /compute")
+
+        if headers.get("content-type", "").startswith(NPZ_CONTENT_TYPE):
+            request = parse_npz(body, self.constants)
+        else:
+            request = parse_json(body, self.constants)
+
+        results = await self.evaluate(*request)
+
+        if NPZ_CONTENT_TYPE in headers.get("accept", ""):
+            return 200, NPZ_CONTENT_TYPE, encode_npz(results)
+
+        return 200, "application/json", json.dumps(results_to_dict(results), allow_nan=False).encode()
+
+    # Serves the requests of a connection, which is kept alive until the client closes it
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+
+                method, path, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                started = time.perf_counter()
+                length = int(headers.get("content-length", 0))
+                try:
+                    if length > MAX_BODY_BYTES:
+                        raise RequestError(413, f"payloads are limited to {MAX_BODY_BYTES} bytes")
+                    body = await reader.readexactly(length)
+                    status, content_type, content = await self.respond(method, path.split("?")[0], headers, body)
+                except RequestError as error:
+                    self.metrics.errors += 1
+                    status, content_type, content = error.status, "application/json", json.dumps({"error": str(error)}).encode()
+                except Exception as error:
+                    self.metrics.errors += 1
+                    status, content_type, content = 500, "application/json", json.dumps({"error": repr(error)}).encode()
+
+                close = headers.get("connection", "").lower() == "close" or version == "HTTP/1.0" or status == 413
+                writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: {content_type}\r\n"
+                             f"Content-Length: {len(content)}\r\nConnection: {'close' if close else 'keep-alive'}\r\n\r\n".encode() + content)
+                await writer.drain()
+
+                if path.startswith("/compute") and status == 200:
+                    self.metrics.record(time.perf_counter() - started)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    # Serves until cancelled
+    async def serve(self, port=DEFAULT_PORT):
+        batches = asyncio.create_task(self.run_batches())
+        server = await asyncio.start_server(self.handle, "127.0.0.1", port)
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batches.cancel()
+
+
+# Runs the server until interrupted
+def serve(port=DEFAULT_PORT, constants=Constants(), max_batch=DEFAULT_MAX_BATCH, batch_window=DEFAULT_BATCH_WINDOW):
+    async def main():
+        await Server(constants, max_batch, batch_window).serve(port)
+
+    asyncio.run(main())
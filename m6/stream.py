@@ -0,0 +1,176 @@
+'''
+description:                                Streaming mode for very large sinking time files. The file is read in chunks of a fixed
+                                            number of rows, while running per-column aggregates are updated. The sinking time error
+                                            ranges and the velocities are written out incrementally, so the memory stays bounded
+                                            by the chunk size no matter how large the input is.
+
+Running aggregates:                         The column sums are accumulated row by row like in the in-memory path, so the mean
+                                            sinking times are identical to it. The SEM of the sinking time error ranges uses the
+                                            M2 aggregate of Welford's online algorithm, merged chunk by chunk (Chan et al.), and
+                                            matches the in-memory two-pass result up to rounding.
+
+velocities.csv                              Rows represent the globules, so the velocities of every chunk are formatted once into
+                                            one text segment per globule in a temporary file. At the end the segments of every
+                                            globule are copied one after another into its row of the CSV file, so every value is
+                                            read once and the memory stays bounded by a segment.
+'''
+
+import io
+import itertools
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from m6 import engine, profiling
+from m6.core import GLOBULE_STAGES, Constants, Results, select_stages
+from m6.reader import (FILENAME_GLOBULES_DENSITY, FILENAME_GLOBULES_DENSITY_ERRORRANGES, FILENAME_GLOBULES_DIAMETERS,
+                       FILENAME_SINKINGTIMES, read_csv, read_globules, read_npy, sinkingtimes_location)
+from m6.writer import CSV_FILES, write_csv_results, write_csv_rows
+
+DEFAULT_CHUNK_ROWS = 65536
+
+# Results, which have one value per measurement and are written incrementally
+ROW_FIELDS = ("sinkingtimes_errorranges", "velocities")
+
+
+# Running per-column count, sum, mean and M2 of a matrix, which is fed row chunk by row chunk
+class RunningStatistics:
+
+    def __init__(self, columns):
+        self.count = 0
+        self.total = np.zeros(columns)
+        self.mean = np.zeros(columns)
+        self.m2 = np.zeros(columns)
+
+    # Adds the rows of a chunk to the aggregates
+    def update(self, chunk):
+        items = chunk.shape[0]
+        if items == 0:
+            return
+
+        # Prepending the running sum keeps the row by row summation order of the in-memory path
+        self.total = engine.sequential_sum(np.concatenate((self.total[np.newaxis], chunk)))
+
+        chunk_mean = engine.sequential_sum(chunk) / items
+        chunk_m2 = engine.sequential_sum(np.square(chunk - chunk_mean))
+
+        count = self.count + items
+        delta = chunk_mean - self.mean
+        self.mean += delta * (items / count)
+        self.m2 += chunk_m2 + np.square(delta) * (self.count * items / count)
+        self.count = count
+
+    # Mean values in the same way as engine.mean_values
+    def means(self):
+        return self.total / self.count
+
+    # SEM in the same way as engine.mean_sinkingtimes_errorranges
+    def sem(self):
+        return np.sqrt((self.m2 / (self.count - 1)) / self.count)
+
+    # Aggregates as dictionary of arrays, e.g. to store them with numpy.savez
+    def to_arrays(self, prefix):
+        return {prefix + "count": np.array(self.count), prefix + "total": self.total, prefix + "mean": self.mean, prefix + "m2": self.m2}
+
+    # Restores the aggregates of to_arrays
+    @classmethod
+    def from_arrays(cls, arrays, prefix):
+        statistics = cls(arrays[prefix + "total"].shape[0])
+        statistics.count = int(arrays[prefix + "count"])
+        statistics.total = np.array(arrays[prefix + "total"])
+        statistics.mean = np.array(arrays[prefix + "mean"])
+        statistics.m2 = np.array(arrays[prefix + "m2"])
+
+        return statistics
+
+
+# Reads a headerless CSV file or a .npy file in chunks of float64 arrays
+def read_chunks(location, chunk_rows=DEFAULT_CHUNK_ROWS):
+    if Path(location).suffix == ".npy":
+        values = read_npy(location)
+        for start in range(0, values.shape[0], chunk_rows):
+            yield np.asarray(values[start:start + chunk_rows])
+        return
+
+    with open(location) as file:
+        while True:
+            with profiling.step("read " + Path(location).name) as measured:
+                lines = "".join(itertools.islice(file, chunk_rows))
+                chunk = read_csv(io.StringIO(lines)) if lines.strip() else None
+                measured.bytes_read = len(lines)
+                measured.elements = chunk.size if chunk is not None else 0
+
+            if not lines:
+                return
+            if chunk is not None:
+                yield chunk
+
+# Appends the velocities of a chunk to the temporary file as one text segment per globule and records the offsets of
+# the segments
+def append_velocities(velocities_file, velocities, segments):
+    offsets = [velocities_file.tell()]
+    for column in velocities.T.tolist():
+        velocities_file.write(",".join(map(repr, column)).encode())
+        offsets.append(velocities_file.tell())
+
+    segments.append(offsets)
+
+# Copies the text segments of the temporary file globule by globule into velocities.csv
+def write_velocities(location, velocities_file, segments, rows, globules):
+    with profiling.step("write " + Path(location).name, rows * globules) as measured, open(location, "w") as file:
+        for globule in range(0, globules):
+            for index, offsets in enumerate(segments):
+                if index:
+                    file.write(",")
+                velocities_file.seek(offsets[globule])
+                file.write(velocities_file.read(offsets[globule + 1] - offsets[globule]).decode())
+            file.write("\n")
+
+        measured.bytes_written = file.tell()
+
+# Calculates all values of experiment M6 by streaming the sinking times and writes them to the output directory.
+# The returned Results contain no rows for the incrementally written sinking time error ranges and velocities.
+def compute_stream(path_input, path_output, constants=Constants(), chunk_rows=DEFAULT_CHUNK_ROWS, error_method="minmax",
+                   filename_sinkingtimes=FILENAME_SINKINGTIMES,
+                   filename_globules_diameters=FILENAME_GLOBULES_DIAMETERS,
+                   filename_globules_density=FILENAME_GLOBULES_DENSITY,
+                   filename_globules_density_errorranges=FILENAME_GLOBULES_DENSITY_ERRORRANGES):
+    path_input = Path(path_input)
+    path_output = Path(path_output)
+
+    measurements = read_globules(path_input, filename_globules_diameters, filename_globules_density, filename_globules_density_errorranges)
+    globules = measurements.globules_diameters.shape[0]
+    times_statistics = RunningStatistics(globules)
+    errorranges_statistics = RunningStatistics(globules)
+
+    segments = []
+
+    with open(path_output / "sinkingtimes_errorranges.csv", "w") as errorranges_file, tempfile.TemporaryFile() as velocities_file:
+        for chunk in read_chunks(sinkingtimes_location(path_input / filename_sinkingtimes), chunk_rows):
+            if chunk.shape[1] != globules:
+                raise ValueError(f"{filename_globules_diameters} has {globules} values, but there are {chunk.shape[1]} globule columns in {filename_sinkingtimes}")
+
+            with profiling.step("running_statistics", chunk.size):
+                errorranges = engine.sinkingtimes_errorranges(chunk)
+                times_statistics.update(chunk)
+                errorranges_statistics.update(errorranges)
+
+            write_csv_rows(errorranges_file, errorranges)
+            append_velocities(velocities_file, np.divide(constants.cylinder_length, chunk), segments)
+
+        if times_statistics.count == 0:
+            raise ValueError(f"{filename_sinkingtimes} contains no measurements")
+
+        write_velocities(path_output / "velocities.csv", velocities_file, segments, times_statistics.count, globules)
+
+    results = Results.allocate(0, globules)
+    results.mean_sinkingtimes[:] = times_statistics.means()
+    results.mean_sinkingtimes_errorranges[:] = errorranges_statistics.sem()
+
+    for stage in select_stages(GLOBULE_STAGES, error_method):
+        stage(measurements, constants, results)
+
+    write_csv_results(results, path_output, fields=[field for _, field in CSV_FILES if field not in ROW_FIELDS])
+
+    return results
@@ -0,0 +1,295 @@
+'''
+description:                                Sweep mode for viscosity-temperature curves of one or more fluids. A sweep table lists
+                                            one measurement set per fluid and temperature together with the fluid density at that
+                                            temperature. All entries are computed in one pass: entries with the same number of
+                                            series go through compute_batch() together, with the fluid density of every entry as
+                                            array over its globule columns. A viscosity-temperature model is fitted per fluid.
+
+Sweep table:                                CSV file with a header and one row per measurement set
+                                                fluid,temperature,fluid_density,fluid_density_errorrange,path_input
+                                                silicone oil,293.15,965,0.5,oil/20C
+                                            temperature in K and fluid density in kg/m^3, fluid and fluid_density_errorrange
+                                            are optional, path_input is relative to the table and contains the four input files
+
+Models:                                     arrhenius       eta(T) = A * exp(B / T)
+                                            vogel_fulcher   eta(T) = A * exp(B / (T - T0))
+                                            Both are fitted by weighted least squares of ln(eta) with the error range of eta as
+                                            uncertainty, eta / error range of ln(eta). ln(A), B and T0 are the fitted parameters,
+                                            the covariance is given for them. Vogel-Fulcher needs three temperatures, T0 is found
+                                            on a grid below the lowest temperature and refined by golden section search, with
+                                            ln(A) and B solved linearly for every T0.
+'''
+
+import csv
+import dataclasses
+import json
+import math
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from m6.core import Constants, compute_batch
+from m6.reader import read_measurements
+
+SWEEP_FILENAME = "sweep.csv"
+FITS_FILENAME = "viscosity_fits.json"
+FIT_MODELS = ("arrhenius", "vogel_fulcher")
+FIT_QUANTITIES = ("mean_ladenburg_dynamic_viscosity", "mean_dynamic_viscosity")
+T0_GRID_POINTS = 256
+GOLDEN_SECTION_STEPS = 100
+
+SWEEP_FIELDS = (
+    "fluid",
+    "temperature",
+    "fluid_density",
+    "fluid_density_errorrange",
+    "path_input",
+    "series",
+    "globules",
+    "mean_dynamic_viscosity",
+    "mean_dynamic_viscosity_errorrange",
+    "mean_ladenburg_dynamic_viscosity",
+    "mean_ladenburg_dynamic_viscosity_errorrange",
+    "kinematic_viscosity",
+    "kinematic_viscosity_errorrange",
+    "max_reynolds_number",
+    "rejected_sinkingtimes",
+)
+
+
+@dataclass
+class SweepEntry:
+    fluid: str
+    temperature: float
+    fluid_density: float
+    fluid_density_errorrange: float
+    path_input: Path
+
+
+@dataclass
+class ViscosityFit:
+    fluid: str
+    model: str
+    quantity: str
+    parameters: dict
+    errors: dict
+    covariance: list
+    chi2: float
+    dof: int
+
+
+# Reads the entries of a sweep table, missing fluid density error ranges are taken from the constants
+def read_sweep_table(location, constants=Constants()):
+    location = Path(location)
+    entries = []
+
+    with open(location, newline="") as table:
+        for row in csv.DictReader(table):
+            errorrange = (row.get("fluid_density_errorrange") or "").strip()
+            entries.append(SweepEntry(
+                fluid=(row.get("fluid") or "").strip(),
+                temperature=float(row["temperature"]),
+                fluid_density=float(row["fluid_density"]),
+                fluid_density_errorrange=float(errorrange) if errorrange else constants.fluid_density_errorrange,
+                path_input=location.parent / row["path_input"].strip(),
+            ))
+
+    if not entries:
+        raise ValueError(f"{location} contains no sweep entries")
+
+    return entries
+
+# Computes the results of all entries, entries with the same number of series are computed together
+def compute_sweep(entries, constants=Constants(), error_method="minmax", outliers=None):
+    measurements = [read_measurements(entry.path_input) for entry in entries]
+    entry_constants = [dataclasses.replace(constants, fluid_density=entry.fluid_density, fluid_density_errorrange=entry.fluid_density_errorrange)
+                       for entry in entries]
+
+    groups = {}
+    for index, m in enumerate(measurements):
+        groups.setdefault(m.sinkingtimes.shape[0], []).append(index)
+
+    results = [None] * len(entries)
+    for indices in groups.values():
+        batch = compute_batch([measurements[index] for index in indices], [entry_constants[index] for index in indices], error_method,
+                              outliers)
+        for index, r in zip(indices, batch):
+            results[index] = r
+
+    return results
+
+# Weighted linear least squares, returns the parameters, their covariance and chi^2. Without usable uncertainties the
+# fit is unweighted and the covariance is scaled by the variance of the residuals.
+def weighted_least_squares(design, values, sigmas):
+    weighted = bool(np.all(np.isfinite(sigmas)) and np.all(sigmas > 0))
+    weights = 1 / sigmas if weighted else np.ones_like(values)
+
+    a = design * weights[:, np.newaxis]
+    b = values * weights
+    parameters = np.linalg.lstsq(a, b, rcond=None)[0]
+    chi2 = float(np.sum(np.square(a @ parameters - b)))
+    covariance = np.linalg.pinv(a.T @ a)
+
+    dof = values.shape[0] - design.shape[1]
+    if not weighted and dof > 0:
+        covariance *= chi2 / dof
+
+    return parameters, covariance, chi2
+
+# Fits ln(eta) = ln(A) + B / T
+def fit_arrhenius(temperatures, values, sigmas):
+    design = np.column_stack((np.ones_like(temperatures), 1 / temperatures))
+    parameters, covariance, chi2 = weighted_least_squares(design, values, sigmas)
+
+    return {"ln_A": parameters[0], "B": parameters[1]}, covariance, chi2
+
+# chi^2 of the Vogel-Fulcher model for a fixed T0 with ln(A) and B solved linearly
+def vogel_fulcher_chi2(t0, temperatures, values, sigmas):
+    design = np.column_stack((np.ones_like(temperatures), 1 / (temperatures - t0)))
+    return weighted_least_squares(design, values, sigmas)[2]
+
+# Fits ln(eta) = ln(A) + B / (T - T0)
+def fit_vogel_fulcher(temperatures, values, sigmas):
+    upper = temperatures.min() * (1 - 1e-6)
+    grid = np.linspace(0, upper, T0_GRID_POINTS, endpoint=False)
+    chi2 = [vogel_fulcher_chi2(t0, temperatures, values, sigmas) for t0 in grid]
+
+    # Golden section search between the neighbours of the best grid point
+    best = int(np.argmin(chi2))
+    low, high = grid[max(best - 1, 0)], grid[best + 1] if best + 1 < grid.shape[0] else upper
+    ratio = (math.sqrt(5) - 1) / 2
+    for _ in range(0, GOLDEN_SECTION_STEPS):
+        left, right = high - ratio * (high - low), low + ratio * (high - low)
+        if vogel_fulcher_chi2(left, temperatures, values, sigmas) < vogel_fulcher_chi2(right, temperatures, values, sigmas):
+            high = right
+        else:
+            low = left
+    t0 = (low + high) / 2
+
+    design = np.column_stack((np.ones_like(temperatures), 1 / (temperatures - t0)))
+    (ln_a, b), _, chi2 = weighted_least_squares(design, values, sigmas)
+
+    # Covariance of all three parameters from the Jacobian at the optimum
+    jacobian = np.column_stack((np.ones_like(temperatures), 1 / (temperatures - t0), b / np.square(temperatures - t0)))
+    weighted = bool(np.all(np.isfinite(sigmas)) and np.all(sigmas > 0))
+    weights = 1 / sigmas if weighted else np.ones_like(values)
+    a = jacobian * weights[:, np.newaxis]
+    covariance = np.linalg.pinv(a.T @ a)
+
+    dof = values.shape[0] - 3
+    if not weighted and dof > 0:
+        covariance *= chi2 / dof
+
+    return {"ln_A": ln_a, "B": b, "T0": t0}, covariance, chi2
+
+FITTERS = {
+    "arrhenius":     (fit_arrhenius, 2),
+    "vogel_fulcher": (fit_vogel_fulcher, 3),
+}
+
+# Fits the models to the viscosity of every fluid, fluids with too few temperatures for a model are skipped
+def fit_viscosity(entries, results, models=FIT_MODELS, quantity=FIT_QUANTITIES[0]):
+    fits = []
+
+    for fluid in dict.fromkeys(entry.fluid for entry in entries):
+        indices = [index for index, entry in enumerate(entries) if entry.fluid == fluid]
+        temperatures = np.array([entries[index].temperature for index in indices])
+        viscosities = np.array([getattr(results[index], quantity) for index in indices])
+        errorranges = np.array([getattr(results[index], quantity + "_errorrange") for index in indices])
+
+        for model in models:
+            fitter, parameter_count = FITTERS[model]
+            if np.unique(temperatures).shape[0] < parameter_count:
+                continue
+
+            parameters, covariance, chi2 = fitter(temperatures, np.log(viscosities), errorranges / np.abs(viscosities))
+            fits.append(ViscosityFit(
+                fluid=fluid,
+                model=model,
+                quantity=quantity,
+                parameters={name: float(value) for name, value in parameters.items()},
+                errors={name: float(np.sqrt(covariance[i, i])) for i, name in enumerate(parameters)},
+                covariance=covariance.tolist(),
+                chi2=chi2,
+                dof=temperatures.shape[0] - parameter_count,
+            ))
+
+    return fits
+
+# Viscosity of a fitted model at the given temperatures
+def model_viscosity(fit, temperatures):
+    temperatures = np.asarray(temperatures, dtype=np.float64)
+    t0 = fit.parameters.get("T0", 0.0)
+
+    return np.exp(fit.parameters["ln_A"] + fit.parameters["B"] / (temperatures - t0))
+
+# Writes the single values of every entry into the sweep table of the output directory
+def write_sweep(location, entries, results):
+    with open(location, "w", newline="") as table:
+        writer = csv.DictWriter(table, fieldnames=SWEEP_FIELDS)
+        writer.writeheader()
+
+        for entry, r in zip(entries, results):
+            writer.writerow({
+                "fluid": entry.fluid,
+                "temperature": repr(entry.temperature),
+                "fluid_density": repr(entry.fluid_density),
+                "fluid_density_errorrange": repr(entry.fluid_density_errorrange),
+                "path_input": str(entry.path_input),
+                "series": r.sinkingtimes_errorranges.shape[0],
+                "globules": r.sinkingtimes_errorranges.shape[1],
+                "mean_dynamic_viscosity": repr(r.mean_dynamic_viscosity),
+                "mean_dynamic_viscosity_errorrange": repr(r.mean_dynamic_viscosity_errorrange),
+                "mean_ladenburg_dynamic_viscosity": repr(r.mean_ladenburg_dynamic_viscosity),
+                "mean_ladenburg_dynamic_viscosity_errorrange": repr(r.mean_ladenburg_dynamic_viscosity_errorrange),
+                "kinematic_viscosity": repr(r.kinematic_viscosity),
+                "kinematic_viscosity_errorrange": repr(r.kinematic_viscosity_errorrange),
+                "max_reynolds_number": repr(float(np.max(r.reynolds_number))),
+                "rejected_sinkingtimes": int(r.rejected_sinkingtimes.sum()) if r.rejected_sinkingtimes is not None else "",
+            })
+
+# Writes the fits as JSON
+def write_fits(location, fits):
+    Path(location).write_text(json.dumps([dataclasses.asdict(fit) for fit in fits], indent=1))
+
+# Unique output directory name of every entry
+def entry_names(entries):
+    names = []
+    seen = {}
+
+    for entry in entries:
+        name = "".join(character if character.isalnum() or character in "-." else "_" for character in f"{entry.fluid or 'fluid'}_{entry.temperature:g}K")
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+
+    return names
+
+# Computes all entries of a sweep table, writes the results of every entry into its own subdirectory, the sweep table
+# and the fits into the output directory and returns the entries, their results and the fits
+def run_sweep(location, path_output, constants=Constants(), error_method="minmax", models=FIT_MODELS, quantity=FIT_QUANTITIES[0],
+              output_format="csv", outliers=None):
+    from m6.writer import write_results
+
+    entries = read_sweep_table(location, constants)
+    results = compute_sweep(entries, constants, error_method, outliers)
+    fits = fit_viscosity(entries, results, models, quantity)
+
+    path_output = Path(path_output)
+    for name, r in zip(entry_names(entries), results):
+        (path_output / name).mkdir(parents=True, exist_ok=True)
+        write_results(r, path_output / name, output_format)
+
+    write_sweep(path_output / SWEEP_FILENAME, entries, results)
+    write_fits(path_output / FITS_FILENAME, fits)
+
+    return entries, results, fits
+
+# Formats the fits for the console
+def format_fits(fits):
+    lines = []
+    for fit in fits:
+        parameters = ", ".join(f"{name} = {value!r} +- {fit.errors[name]!r}" for name, value in fit.parameters.items())
+        lines.append(f"{fit.fluid or 'fluid'} | {fit.model} | {fit.quantity} | {parameters} | chi2 = {fit.chi2!r} | dof = {fit.dof}\n")
+
+    return "".join(lines)
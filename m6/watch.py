@@ -0,0 +1,245 @@
+'''
+description:                                Watch mode for live readouts during a lab session. The input directory is watched for
+                                            changes of the sinking times and globule files, the results are updated in the same
+                                            process by m6.incremental and published as output files and, optionally, as JSON over
+                                            a local HTTP endpoint.
+
+Watchers:                                   inotify     Linux, used through ctypes on libc, wakes up at once on every change
+                                            polling     fallback on other platforms or if inotify is not available, compares
+                                                        size and modification time of the input files every poll_interval
+
+Debounce:                                   After the first event, further events are collected until none arrived for debounce
+                                            seconds, so a burst of writes to the input files results in a single update.
+
+Recompute:                                  Appended sinking times are merged into the running state of m6.incremental, changed
+                                            globule files only rerun the per globule stages. A rewritten sinking times file
+                                            rebuilds the state from the start of the file.
+
+Publish:                                    The output files are replaced atomically, see m6.writer. With a port, GET /results
+                                            on 127.0.0.1 returns the latest results with the number of updates, the new rows and
+                                            the latency from the first event to the published results as JSON.
+'''
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from m6.core import Constants
+from m6.incremental import update
+from m6.reader import (FILENAME_GLOBULES_DENSITY, FILENAME_GLOBULES_DENSITY_ERRORRANGES, FILENAME_GLOBULES_DIAMETERS,
+                       FILENAME_SINKINGTIMES)
+from m6.writer import results_to_dict
+
+DEFAULT_DEBOUNCE = 0.005        # in s
+DEFAULT_POLL_INTERVAL = 0.1     # in s
+WAKEUP_INTERVAL = 0.5           # in s, how often a waiting watcher checks, whether it has to stop
+
+# inotify events of a completed write, a moved in file and a new file
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+# struct inotify_event without the name: wd, mask, cookie, len
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    # Waits up to timeout seconds for events and returns the names of the changed files, an empty set on timeout
+    def wait(self, timeout):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return set()
+
+        names = set()
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            names.add(os.fsdecode(data[offset:offset + length].rstrip(b"\0")))
+            offset += length
+
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    def __init__(self, directory, names, interval=DEFAULT_POLL_INTERVAL):
+        self.directory = Path(directory)
+        self.names = tuple(names)
+        self.interval = interval
+        self.snapshot = self.stat()
+
+    # Size and modification time of every watched file, None for missing files
+    def stat(self):
+        snapshot = {}
+        for name in self.names:
+            try:
+                result = os.stat(self.directory / name)
+                snapshot[name] = (result.st_size, result.st_mtime_ns)
+            except FileNotFoundError:
+                snapshot[name] = None
+
+        return snapshot
+
+    # Waits up to timeout seconds for changes and returns the names of the changed files, an empty set on timeout
+    def wait(self, timeout):
+        deadline = time.monotonic() + timeout
+
+        while True:
+            snapshot = self.stat()
+            changed = {name for name in self.names if snapshot[name] != self.snapshot[name]}
+            self.snapshot = snapshot
+            if changed:
+                return changed
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return set()
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+# Creates an inotify watcher, or a polling watcher if polling is forced or inotify isn't available
+def create_watcher(directory, names, polling=False, poll_interval=DEFAULT_POLL_INTERVAL):
+    if not polling:
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError, TypeError):
+            pass
+
+    return PollingWatcher(directory, names, poll_interval)
+
+# Yields the changed input files and the time of their first event after every debounced burst of events
+def changes(watcher, names, debounce=DEFAULT_DEBOUNCE, stop=None):
+    while stop is None or not stop.is_set():
+        changed = watcher.wait(WAKEUP_INTERVAL) & names
+        if not changed:
+            continue
+
+        first_event = time.perf_counter()
+        while True:
+            more = watcher.wait(debounce) & names
+            if not more:
+                break
+            changed |= more
+
+        yield changed, first_event
+
+
+class Publisher:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.updates = 0
+        self.document = json.dumps({"updates": 0, "results": None}).encode()
+
+    # Encodes the results once per update, so every request only sends the stored bytes
+    def publish(self, results, new_rows, changed, latency):
+        with self.lock:
+            self.updates += 1
+            self.document = json.dumps({
+                "updates": self.updates,
+                "updated": time.time(),
+                "new_rows": new_rows,
+                "changed": sorted(changed),
+                "latency_ms": latency * 1000,
+                "results": results_to_dict(results),
+            }).encode()
+
+    def latest(self):
+        with self.lock:
+            return self.document
+
+
+# Starts the HTTP endpoint on 127.0.0.1 in a daemon thread
+def serve(publisher, port):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in ("/", "/results"):
+                self.send_error(404)
+                return
+
+            body = publisher.latest()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+# Watches the input directory and updates the results on every change until stop is set. on_update is called with the
+# results, the number of new rows, the changed files and the latency in seconds after every published update.
+def watch(path_input, path_output, constants=Constants(), error_method="minmax", debounce=DEFAULT_DEBOUNCE, polling=False,
+          poll_interval=DEFAULT_POLL_INTERVAL, port=None, on_update=None, stop=None,
+          filename_sinkingtimes=FILENAME_SINKINGTIMES,
+          filename_globules_diameters=FILENAME_GLOBULES_DIAMETERS,
+          filename_globules_density=FILENAME_GLOBULES_DENSITY,
+          filename_globules_density_errorranges=FILENAME_GLOBULES_DENSITY_ERRORRANGES):
+    filenames = (filename_sinkingtimes, filename_globules_diameters, filename_globules_density, filename_globules_density_errorranges)
+    names = set(filenames)
+    path_output = Path(path_output)
+    path_output.mkdir(parents=True, exist_ok=True)
+
+    publisher = Publisher()
+    server = serve(publisher, port) if port is not None else None
+    watcher = create_watcher(path_input, names, polling, poll_interval)
+
+    # Updates and publishes the results, errors of half written or invalid input files are reported and skipped
+    def refresh(changed, first_event):
+        try:
+            results, new_rows = update(path_input, path_output, constants, error_method, *filenames)
+        except (OSError, ValueError) as error:
+            print(f"{sorted(changed)}: {error}", file=sys.stderr)
+            return
+
+        latency = time.perf_counter() - first_event
+        publisher.publish(results, new_rows, changed, latency)
+        if on_update is not None:
+            on_update(results, new_rows, changed, latency)
+
+    try:
+        refresh(names, time.perf_counter())
+        for changed, first_event in changes(watcher, names, debounce, stop):
+            refresh(changed, first_event)
+    finally:
+        watcher.close()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,220 @@
+'''
+description:                                Writes the results of experiment M6 to the output directory, either as the legacy set
+                                            of separated CSV files or as one consolidated columnar file, which is written with a
+                                            single buffered write per run. Every file is written to a temporary file next to it
+                                            first and moved into place, so readers like the watch mode never see a partial file.
+
+Output formats:                             csv     18 separated headerless CSV files, with outlier rejection also
+                                                    rejected_sinkingtimes.csv with 1 at every rejected sinking time
+                                            parquet results.parquet, one row per globule, the velocities and the sinking time
+                                                    error ranges of a globule are list columns, all scalar results are stored
+                                                    as JSON in the schema metadata (needs pyarrow)
+                                            npz     results.npz, one array per result
+                                            hdf5    results.h5, one dataset per result (needs h5py)
+                                            auto    parquet if pyarrow is installed, npz otherwise
+'''
+
+import csv
+import dataclasses
+import io
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from m6 import profiling
+from m6.core import OPTIONAL_FIELDS, SCALAR_FIELDS, Results
+
+# Output file name and the matching field of Results, in the order of the pipeline
+CSV_FILES = (
+    ("sinkingtimes_errorranges.csv",                    "sinkingtimes_errorranges"),
+    ("mean_times.csv",                                  "mean_sinkingtimes"),
+    ("mean_sinkingtimes_errorranges.csv",               "mean_sinkingtimes_errorranges"),
+    ("velocities.csv",                                  "velocities"),
+    ("mean_velocities.csv",                             "mean_velocities"),
+    ("mean_velocities_errorranges.csv",                 "mean_velocities_errorranges"),
+    ("dynamic_viscosity.csv",                           "dynamic_viscosity"),
+    ("ladenburg_dynamic_viscosity.csv",                 "ladenburg_dynamic_viscosity"),
+    ("dynamic_viscosity_errorranges.csv",               "dynamic_viscosity_errorranges"),
+    ("ladenburg_dynamic_viscosity_errorranges.csv",     "ladenburg_dynamic_viscosity_errorranges"),
+    ("mean_dynamic_viscosity.csv",                      "mean_dynamic_viscosity"),
+    ("mean_ladenburg_dynamic_viscosity.csv",            "mean_ladenburg_dynamic_viscosity"),
+    ("mean_dynamic_viscosity_errorrange.csv",           "mean_dynamic_viscosity_errorrange"),
+    ("mean_ladenburg_dynamic_viscosity_errorrange.csv", "mean_ladenburg_dynamic_viscosity_errorrange"),
+    ("kinematic_viscosity.csv",                         "kinematic_viscosity"),
+    ("kinematic_viscosity_errorrange.csv",              "kinematic_viscosity_errorrange"),
+    ("reynolds_number.csv",                             "reynolds_number"),
+    ("reynolds_number_errorrange.csv",                  "reynolds_number_errorrange"),
+)
+
+# Output file of the rejected sinking times, written only if outliers were rejected
+REJECTED_FILENAME = "rejected_sinkingtimes.csv"
+
+OUTPUT_FORMATS = ("csv", "parquet", "npz", "hdf5", "auto")
+
+RESULTS_FILENAMES = {
+    "parquet": "results.parquet",
+    "npz":     "results.npz",
+    "hdf5":    "results.h5",
+}
+
+PARQUET_METADATA_KEY = b"m6.scalars"
+
+MONTE_CARLO_FILENAME = "monte_carlo.csv"
+
+CSV_BLOCK_ROWS = 4096
+
+
+# Resolves the output format auto to parquet or npz
+def resolve_format(output_format):
+    if output_format != "auto":
+        return output_format
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return "npz"
+
+    return "parquet"
+
+# Temporary file next to a location, which replaces it by os.replace once it is written completely, so readers never
+# see a partially written output file
+def temporary_location(location):
+    return location.with_name(location.name + ".tmp")
+
+# Formats a value like DataFrame.to_csv, which writes the shortest repr of a float and nothing for NaN
+def format_value(value):
+    return repr(value) if value == value else ""
+
+# Writes the rows of a 2D array to an open text file in the same format as DataFrame.to_csv without header and index. The
+# rows are formatted in blocks of CSV_BLOCK_ROWS, so the memory stays bounded by a block.
+def write_csv_rows(file, values):
+    with profiling.step("write " + Path(str(getattr(file, "name", "buffer"))).name.removesuffix(".tmp"), values.size) as measured:
+        written = 0
+        for start in range(0, values.shape[0], CSV_BLOCK_ROWS):
+            text = "".join(",".join(map(format_value, row)) + "\n" for row in values[start:start + CSV_BLOCK_ROWS].tolist())
+            file.write(text)
+            written += len(text)
+        measured.bytes_written = written
+
+# Writes all or the given results as separated CSV files, rows and columns like in Results.to_frame()
+def write_csv_results(results, path_output, fields=None):
+    for filename, field in CSV_FILES:
+        if fields is None or field in fields:
+            temporary = temporary_location(path_output / filename)
+            with open(temporary, "w") as file:
+                write_csv_rows(file, np.atleast_2d(getattr(results, field)))
+            os.replace(temporary, path_output / filename)
+
+    if fields is None and results.rejected_sinkingtimes is not None:
+        temporary = temporary_location(path_output / REJECTED_FILENAME)
+        with open(temporary, "w") as file:
+            write_csv_rows(file, results.rejected_sinkingtimes.astype(np.int8))
+        os.replace(temporary, path_output / REJECTED_FILENAME)
+
+# Fields of Results, which have a value, the optional ones are left out if they weren't calculated
+def present_fields(results):
+    return [field for field in dataclasses.fields(Results) if field.name not in OPTIONAL_FIELDS or getattr(results, field.name) is not None]
+
+# Encodes all results as NPZ archive
+def encode_npz(results):
+    buffer = io.BytesIO()
+    np.savez(buffer, **{field.name: np.asarray(getattr(results, field.name)) for field in present_fields(results)})
+
+    return buffer.getvalue()
+
+# Encodes all results as HDF5 file
+def encode_hdf5(results):
+    import h5py
+
+    buffer = io.BytesIO()
+    with h5py.File(buffer, "w") as file:
+        for field in present_fields(results):
+            file.create_dataset(field.name, data=getattr(results, field.name))
+
+    return buffer.getvalue()
+
+# Encodes all results as Parquet table with one row per globule
+def encode_parquet(results):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = {"globule": np.arange(results.mean_sinkingtimes.shape[0])}
+    for field in present_fields(results):
+        if field.name in SCALAR_FIELDS:
+            continue
+
+        values = getattr(results, field.name)
+        if field.name in ("sinkingtimes_errorranges", "rejected_sinkingtimes"):
+            values = values.T
+
+        columns[field.name] = list(values) if values.ndim == 2 else values
+
+    scalars = {name: getattr(results, name) for name in SCALAR_FIELDS}
+    table = pa.table(columns).replace_schema_metadata({PARQUET_METADATA_KEY: json.dumps(scalars)})
+
+    buffer = pa.BufferOutputStream()
+    pq.write_table(table, buffer)
+
+    return buffer.getvalue().to_pybytes()
+
+ENCODERS = {
+    "parquet": encode_parquet,
+    "npz":     encode_npz,
+    "hdf5":    encode_hdf5,
+}
+
+# Writes all results to the output directory and returns the written location
+def write_results(results, path_output, output_format="csv"):
+    path_output = Path(path_output)
+    output_format = resolve_format(output_format)
+
+    if output_format == "csv":
+        write_csv_results(results, path_output)
+        return path_output
+
+    location = path_output / RESULTS_FILENAMES[output_format]
+    with profiling.step("write " + location.name) as measured:
+        data = ENCODERS[output_format](results)
+        temporary = temporary_location(location)
+        temporary.write_bytes(data)
+        os.replace(temporary, location)
+        measured.bytes_written = len(data)
+
+    return location
+
+# Converts a result to plain lists and floats for JSON, NaN and infinite values become None, as JSON has no literal for them
+def json_values(values):
+    values = np.asarray(values)
+    if values.dtype.kind != "f" or np.isfinite(values).all():
+        return values.tolist()
+
+    return np.where(np.isfinite(values), values, None).tolist()
+
+# Converts all results to plain lists and floats for JSON
+def results_to_dict(results):
+    return {field.name: json_values(getattr(results, field.name)) for field in present_fields(results)}
+
+# Writes mean, standard deviation and percentiles of every Monte Carlo quantity into one CSV table
+def write_monte_carlo(monte_carlo, path_output):
+    from m6.montecarlo import PERCENTILES
+
+    location = Path(path_output) / MONTE_CARLO_FILENAME
+    with profiling.step("write " + location.name) as measured, open(location, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["quantity", "globule", "mean", "std"] + [f"p{percentile:g}" for percentile in PERCENTILES])
+
+        for name, distribution in monte_carlo.quantities.items():
+            means = np.atleast_1d(distribution.mean)
+            stds = np.atleast_1d(distribution.std)
+            percentiles = distribution.percentiles.reshape(len(PERCENTILES), -1)
+            scalar = np.ndim(distribution.mean) == 0
+
+            for globule in range(0, means.shape[0]):
+                writer.writerow([name, "" if scalar else globule, repr(float(means[globule])), repr(float(stds[globule]))]
+                                + [repr(float(value)) for value in percentiles[:, globule]])
+
+        measured.bytes_written = file.tell()
+
+    return location